@@ -4,6 +4,23 @@ STREAM = False                                        # True or False | Enables
 
 ACCOUNTS_IN_STREAM = 10                               # Number of accounts in the stream
 
+PROCESSES = 1                                         # Number of processes the accounts are split between (1 - no split), used only with STREAM
+                                                      # the limits below are for the whole run and are divided between the processes
+
+ACCOUNTS_PER_PROXY_HOST = None                        # None - no limit | Max accounts running at once through the same proxy host
+
+TASKS_IN_NETWORK = 10                                 # Max tasks running at once in one network
+
+TASKS_IN_ACCOUNT = 2                                  # Max independent tasks of one account running at once
+
+PIPELINE_TRANSACTIONS = True                          # True or False | Tasks waiting for a block let the next tasks send their transactions
+
+STAGE_LIMITS = {                                      # Max tasks of each kind running at once across all accounts
+    'onchain': 20,                                    # bridge, deploy, greeting, domain
+    'explorer': 3,                                    # contract verification
+    'offchain': 5,                                    # Discord and faucet requests
+}
+
 SLEEP_TIME_ACCOUNTS = (30, 120)                       # (minimum, maximum) seconds | Sleep time between accounts
 
 SLEEP_TIME_TASKS = (30, 120)                          # (minimum, maximum) seconds | Sleep time between tasks
@@ -13,6 +30,8 @@ SHUFFLE_ACCOUNTS = True                               # To mix accounts or not
 SHUFFLE_TASKS = False                                 # Shuffle the assignments or not
 
 
+ACCOUNTS_FILE = 'data/accounts.xlsx'                  # Accounts table: .xlsx, .csv or .tsv (name, private key, proxy, DS token)
+
 ACCOUNTS_TO_WORK: int | tuple | list = 0              # 0 - all accounts
                                                       # 1 - account No. 1
                                                       # 1, 7 - accounts 1 and 7
@@ -25,6 +44,69 @@ ACCOUNTS_TO_WORK: int | tuple | list = 0              # 0 - all accounts
 
 MIN_AVAILABLE_BALANCE = int(100000000000000)                        # Minimum balance
 
+MIN_DEPLOY_BALANCE = int(2000000000000000)                          # Minimum balance to deploy a contract
+
 RANDOM_RANGE = (0.01, 0.1)                                          # Range of random values
 
-ROUNDING_LEVELS = (4, 5)                                            # Rounding levels
\ No newline at end of file
+ROUNDING_LEVELS = (4, 5)                                            # Rounding levels
+
+DOMAIN_CANDIDATES = 10                                              # Random domain names checked for availability in one batch
+
+""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+# Network settings (advanced users only)
+
+RPC_CONNECTIONS_LIMIT = 100                                         # Max open connections per RPC endpoint
+
+RPC_CONNECTIONS_PER_HOST = 20                                       # Max open connections to a single host
+
+RPC_KEEPALIVE_TIMEOUT = 30                                          # seconds | How long idle connections are kept alive
+
+RPC_TIMEOUT = 30                                                    # seconds | Timeout of a single RPC request
+
+RPC_FAILOVER_ATTEMPTS = 3                                           # How many endpoints a request is tried on before it fails
+
+RPC_EJECT_AFTER_FAILURES = 3                                        # Consecutive failures after which an endpoint is taken out of rotation
+
+RPC_EJECT_TIME = 60                                                 # seconds | How long a failing endpoint stays out before it is tried again
+
+RPC_WS_HEARTBEAT = 20                                               # seconds | Ping interval that keeps WebSocket connections alive
+
+RPC_READ_CACHE_TTL = 3                                              # seconds | How long chain reads are shared, never longer than one block
+
+RPC_READ_CACHE_SIZE = 2000                                          # Max chain reads kept per network, the oldest used are dropped first
+
+HTTP_CONNECTIONS_LIMIT = 50                                         # Max open connections per proxy for explorer, Discord and faucet requests
+
+HTTP_CONNECTIONS_PER_HOST = 10                                      # Max parallel requests to a single off-chain host
+
+HTTP_REQUESTS_PER_SECOND = 5                                        # Starting request rate per off-chain host, adjusted to the host's answers
+
+HTTP_MAX_REQUESTS_PER_SECOND = 20                                   # Request rate per off-chain host is never raised above this
+
+HTTP_RETRY_ATTEMPTS = 3                                             # Retries of an off-chain request answered with 429 (or 5xx for GET requests)
+
+EXPLORER_CACHE_TTL = 3600                                           # seconds | How long explorer lists are reused, across runs too
+
+EXPLORER_NEGATIVE_TTL = 600                                         # seconds | How long an empty explorer answer is trusted before asking again
+
+EXPLORER_MAX_PAGES = 5                                              # Max pages read from a paginated explorer list
+
+VERIFICATION_CONCURRENCY = 2                                        # Contract verifications submitted to the explorer at the same time
+
+VERIFICATION_POLL_INTERVAL = 10                                     # seconds | How often a submitted verification is checked for completion
+
+VERIFICATION_TIMEOUT = 300                                          # seconds | How long a submitted verification may take before the task fails
+
+FEE_ORACLE_TTL = 6                                                  # seconds | How long network fees are shared between accounts
+
+GAS_PROFILE_HEADROOM = 1.5                                          # Gas limit of a known transaction = most gas it has used * this value
+
+GAS_PROFILE_MAX_ENTRIES = 200                                       # Max gas profiles kept, the ones not used for longest are dropped first
+
+RECEIPT_POLL_INTERVAL = 2                                           # seconds | How often each network is checked for new blocks
+
+RECEIPT_MAX_BLOCK_RANGE = 10                                        # Max new blocks scanned at once before falling back to per-tx lookups
+
+BALANCE_BATCH_SIZE = 50                                             # Balances requested in one batch before the run starts
+
+SCHEDULER_REPORT_INTERVAL = 60                                      # seconds | How often the parallel mode reports its progress
@@ -2,18 +2,52 @@ import asyncio
 import random
 import sys
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from questionary import select, Choice
 
 from utils.core import *
 from generall_settings import *
+from utils.session import AccountSession
 from utils.worker import Worker
-from utils.extra import Extra
 from utils.core.network import Sepolia, Ink_Sepolia
 from data.config import TITLE
 
 
 class Runner:
+    # network and minimum balance each on-chain task needs
+    ACTION_BALANCES = {
+        1: (Sepolia, MIN_AVAILABLE_BALANCE),
+        3: (Ink_Sepolia, MIN_DEPLOY_BALANCE),
+        5: (Ink_Sepolia, MIN_AVAILABLE_BALANCE),
+        8: (Ink_Sepolia, MIN_AVAILABLE_BALANCE),
+    }
+
+    # tasks that bring funds to a network during the run
+    FUNDING_ACTIONS = {
+        Ink_Sepolia: {1, 9},
+    }
+
+    # tasks that need the ERC-721 contract deployed by task 3
+    ACTION_DEPENDENCIES = {
+        4: {3},
+        5: {3},
+        6: {3},
+    }
+
+    NETWORKS = {network.chain_id: network for network in (Sepolia, Ink_Sepolia)}
+
+    ACTION_STAGES = {
+        1: 'onchain',
+        2: 'onchain',
+        3: 'onchain',
+        4: 'explorer',
+        5: 'onchain',
+        6: 'offchain',
+        7: 'offchain',
+        8: 'onchain',
+        9: 'offchain',
+    }
+
     @staticmethod
     async def smart_sleep(up, to, msg: str = None):
         duration = random.randint(up, to)
@@ -24,15 +58,11 @@ class Runner:
         await asyncio.sleep(duration)
 
     @staticmethod
-    async def get_proxy_for_account(account_data: Dict) -> Optional[str]:
-        try:
-            return account_data['proxies']
-        except Exception as error:
-            logger.info(f"Account {account_data['account_name']} runs without a proxy: {error}")
-            return None
+    async def get_proxy_for_account(account: Account) -> Optional[str]:
+        return account.proxy or None
 
     @classmethod
-    def get_selected_accounts(cls) -> List[Dict]:
+    def get_selected_accounts(cls) -> List[Account]:
         accounts = get_accounts_data()
 
         if ACCOUNTS_TO_WORK == 0:
@@ -50,31 +80,22 @@ class Runner:
 
         return []
 
-    async def execute_action(self, account_data: Dict, action: int) -> None:
-        account_name = account_data['account_name']
-        proxy = await self.get_proxy_for_account(account_data)
+    async def execute_action(self, session: AccountSession, action: int):
+        account_name = session.account.name
+        proxy = await self.get_proxy_for_account(session.account)
 
         if action == 1:
             network = Sepolia
         else:
             network = Ink_Sepolia
 
-        client = Client(
-            name=account_name,
-            private_key=account_data['private_key'],
-            proxy=proxy,
-            network=network,
-            ds_auth_token=account_data['ds_auth_token']
-        )
-
         logger.info(
             f"{account_name} | "
             f"Task: {action} | Uses a proxy: {bool(proxy)}"
         )
 
         try:
-            worker = Worker(client=client)
-            extra = Extra(client=client)
+            worker, extra = session.get(network)
 
             action_map = {
                 1: worker.bridge_sepolia_to_ink,
@@ -90,78 +111,266 @@ class Runner:
 
             task_func = action_map.get(action)
             if task_func:
-                await task_func()
+                journal_item.set((session.account.address, action))
+                run_journal.mark(session.account.address, action, 'running')
+                async with hold_limits(stage_limits.get(self.ACTION_STAGES.get(action, 'onchain')), network_limits.get(network)):
+                    result = await task_func()
+                run_journal.mark(session.account.address, action, 'failed' if result is False else 'done')
+                return result
             else:
                 logger.warning(f"{account_name} received an unknown action: {action}")
 
         except Exception as e:
             logger.error(f"Error when executing a {action} task for an account {account_name}: {e}")
+            run_journal.mark(session.account.address, action, 'failed')
+            return False
 
     async def run_account_modules(
         self, 
-        account_data: Dict, 
+        account: Account, 
         proxy: Optional[str], 
         parallel_mode: bool = STREAM, 
         actions_to_perform: Optional[List[int]] = None
     ) -> None:
         
-        logger.info(f"Account startup: {account_data['account_name']} (parallel mode: {parallel_mode})")
+        logger.info(f"Account startup: {account.name} (parallel mode: {parallel_mode})")
 
         actions = actions_to_perform if isinstance(actions_to_perform, list) else [actions_to_perform]
 
         if SHUFFLE_TASKS:
             random.shuffle(actions)
 
-        for action in actions:
-            await self.execute_action(account_data, action)
-            if len(actions) > 1:
-                await self.smart_sleep(
-                    SLEEP_TIME_TASKS[0], SLEEP_TIME_TASKS[1],
-                    msg=f'The following task for {account_data["account_name"]} will be executed via '
-                )
+        async def task_delay():
+            await self.smart_sleep(
+                SLEEP_TIME_TASKS[0], SLEEP_TIME_TASKS[1],
+                msg=f'The following task for {account.name} will be executed via '
+            )
+
+        executed = set()
+
+        async def execute(action: int):
+            executed.add(action)
+            return await self.execute_action(session, action)
+
+        session = AccountSession(account)
+        try:
+            graph = TaskGraph(actions, self.ACTION_DEPENDENCIES)
+            results = await graph.run(execute, limit=TASKS_IN_ACCOUNT, delay=task_delay)
+        finally:
+            session.close()
+
+        # tasks skipped because a task they depend on failed
+        for action in results.keys() - executed:
+            run_journal.mark(account.address, action, 'skipped')
                 
-    async def run_parallel(self, actions_to_perform: Optional[List[int]] = None) -> None:
-        selected_accounts = self.get_selected_accounts()
+    async def prefetch_balances(self, work: List[Tuple[Account, List[int]]]) -> List[Tuple[Account, List[int]]]:
+        networks = {
+            self.ACTION_BALANCES[action][0]
+            for _, actions in work for action in actions if action in self.ACTION_BALANCES
+        }
+        addresses = [account.address for account, _ in work]
+        address_cache.save()
+        for network in networks:
+            await balances.fetch(network, addresses)
+
+        planned = []
+        for (account, actions), address in zip(work, addresses):
+            account_actions = []
+            for action in actions:
+                if action in self.ACTION_BALANCES:
+                    network, min_balance = self.ACTION_BALANCES[action]
+                    balance = balances.get(network.chain_id, address)
+                    topped_up = bool(self.FUNDING_ACTIONS.get(network, set()) & set(actions))
+
+                    if balance is not None and balance < min_balance and not topped_up:
+                        logger.warning(
+                            f"{account.name} | Task {action} is skipped: insufficient "
+                            f"{network.token} on the network: {network.name} | Address: {address}"
+                        )
+                        run_journal.mark(address, action, 'skipped')
+                        continue
+                account_actions.append(action)
+
+            if account_actions:
+                planned.append((account, account_actions))
+            else:
+                logger.warning(f"{account.name} | Skipped: no tasks can be performed with the current balance")
+
+        return planned
+
+    async def run_accounts(self, planned: List[Tuple[Account, List[int]]]) -> Dict[str, int]:
+        async def account_task(item: Tuple[Account, List[int]]) -> None:
+            account, account_actions = item
+            proxy = await self.get_proxy_for_account(account)
+            await self.run_account_modules(account, proxy, actions_to_perform=account_actions)
+
+        scheduler = AccountScheduler(
+            slots=shard_limit(ACCOUNTS_IN_STREAM) if STREAM else 1,
+            handler=account_task,
+            host_key=lambda item: get_proxy_host(item[0].proxy)
+        )
+        await scheduler.run(planned)
+
+        return {'done': scheduler.done, 'failed': scheduler.failed}
+
+    async def run_sharded(self, planned: List[Tuple[Account, List[int]]]) -> None:
+        # accounts of a capped proxy host stay in one process, so the cap is not multiplied
+        host_key = (lambda item: get_proxy_host(item[0].proxy)) if ACCOUNTS_PER_PROXY_HOST is not None else None
+
+        shards = []
+        for shard in split_shards(planned, PROCESSES, key=host_key):
+            addresses = [account.address for account, _ in shard]
+            shards.append((shard, balances.export(addresses)))
+
+        if len(shards) < min(PROCESSES, len(planned)):
+            logger.warning(
+                f"Accounts are split between {len(shards)} processes instead of {PROCESSES}: "
+                f"accounts behind the same proxy host run in the same process"
+            )
+        logger.info(f"Accounts are split between {len(shards)} processes")
+        results = await run_sharded(run_shard, [shard + (len(shards), run_journal.run_id) for shard in shards])
+
+        done = sum(result['done'] for result in results if isinstance(result, dict))
+        failed = sum(result['failed'] for result in results if isinstance(result, dict))
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Process failed: {result}")
+
+        logger.info(f"All processes finished: {done} done | {failed} failed")
+
+    async def close(self) -> None:
+        nonces.clear()
+        network_limits.clear()
+        stage_limits.clear()
+        balances.clear()
+        fee_oracles.clear()
+        read_caches.clear()
+        verification_queues.clear()
+        await receipt_watchers.close()
+        await providers.close()
+        await http_sessions.close()
+        progress_store.close()
+        explorer_cache.close()
+        run_journal.close()
+
+    @staticmethod
+    def restore_result(worker: Worker, action: int, receipt: dict, nonce: int):
+        # the task stopped before it could save what its transaction did, later tasks rely on it
+        if action == 3:
+            worker.save_deployment(receipt, nonce)
+        elif action == 5:
+            worker.save_greeting()
+
+    async def get_sent_state(self, account: Account, action: int) -> Optional[str]:
+        # a task stopped after its broadcast is not repeated until its transaction is known to be lost
+        transaction = run_journal.get_transaction(account.address, action)
+        if transaction is None:
+            return None
+
+        chain_id, tx_hash, nonce = transaction
+        client = Client(self.NETWORKS[chain_id], account)
+        try:
+            receipt, pending = await client.batch_request(
+                [('eth_getTransactionReceipt', [tx_hash]), ('eth_getTransactionByHash', [tx_hash])]
+            )
+            if not isinstance(receipt, dict) and isinstance(pending, dict):
+                logger.info(f"{account.name} | Task {action} transaction {tx_hash} is still pending, waiting for it")
+                receipt = await receipt_watchers.get(client.network).wait_for_receipt(client, tx_hash, 360)
+        except asyncio.TimeoutError:
+            logger.warning(f"{account.name} | Task {action} transaction {tx_hash} is still pending, the task is not repeated")
+            return 'failed'
+        except Exception as error:
+            logger.warning(f"{account.name} | Task {action} is left for the next resume, transaction check failed: {error}")
+            return 'running'
+
+        if isinstance(receipt, dict):
+            if int(receipt['status'], 16) == 1:
+                logger.info(f"{account.name} | Task {action} was completed before the stop: {tx_hash}")
+                self.restore_result(Worker(client), action, receipt, nonce)
+                return 'done'
+            return None
 
-        if SHUFFLE_ACCOUNTS:
-            random.shuffle(selected_accounts)
+        # a dropped transaction cannot land any more, the repeated task sends a new one from the pending nonce
+        logger.warning(f"{account.name} | Task {action} transaction with nonce {nonce} was dropped, the task is repeated")
+        return None
+
+    async def get_resumed_work(self) -> List[Tuple[Account, List[int]]]:
+        unfinished = run_journal.get_unfinished()
+        if unfinished is None:
+            logger.info("There is no interrupted run to resume")
+            return []
+
+        run_id, work = unfinished
+        accounts = {account.address: account for account in get_accounts_data()}
+        address_cache.save()
+
+        resumed = []
+        for address, actions in work:
+            if address not in accounts:
+                logger.warning(f"Account {address} is no longer in {ACCOUNTS_FILE}, its tasks are not resumed")
+                continue
+            resumed.append((accounts[address], actions))
+
+        run_journal.resume(run_id)
+        for account, actions in resumed:
+            for action in list(actions):
+                state = await self.get_sent_state(account, action)
+                if state is not None:
+                    actions.remove(action)
+                if state in ('done', 'failed'):
+                    run_journal.mark(account.address, action, state)
+        resumed = [(account, actions) for account, actions in resumed if actions]
+
+        logger.info(f"Resuming run {run_id}: {sum(len(actions) for _, actions in resumed)} tasks of {len(resumed)} accounts left")
+        return resumed
+
+    async def run(self, actions_to_perform: Optional[List[int]] = None, resume: bool = False) -> None:
+        try:
+            if resume:
+                work = await self.get_resumed_work()
+            else:
+                actions = actions_to_perform if isinstance(actions_to_perform, list) else [actions_to_perform]
+                selected_accounts = self.get_selected_accounts()
 
-        tasks = []
+                if SHUFFLE_ACCOUNTS:
+                    random.shuffle(selected_accounts)
+                work = [(account, list(actions)) for account in selected_accounts]
 
-        for idx, account_data in enumerate(selected_accounts):
-            proxy = await self.get_proxy_for_account(account_data)
+            planned = await self.prefetch_balances(work)
 
-            async def account_task():
-                await self.run_account_modules(account_data, proxy, actions_to_perform=actions_to_perform)
+            verifications = [account.address for account, actions in planned if 4 in actions]
+            if verifications:
+                await Worker.prefetch_verifications(Ink_Sepolia, verifications)
 
-            if idx > 0:
-                if SLEEP_MODE:
-                    await self.smart_sleep(SLEEP_TIME_ACCOUNTS[0], SLEEP_TIME_ACCOUNTS[1])
+            if not resume:
+                run_journal.start([(account.address, actions) for account, actions in planned])
 
-            task = asyncio.create_task(account_task())
-            tasks.append(task)
+            if STREAM and PROCESSES > 1 and len(planned) > 1:
+                await self.run_sharded(planned)
+            else:
+                await self.run_accounts(planned)
 
-        await asyncio.gather(*tasks)
+            run_journal.finish()
+        finally:
+            await self.close()
 
-    async def run_sequential(self, actions_to_perform: Optional[List[int]] = None) -> None:
-        selected_accounts = self.get_selected_accounts()
 
-        if SHUFFLE_ACCOUNTS:
-            random.shuffle(selected_accounts)
+def run_shard(
+    planned: List[Tuple[Account, List[int]]], balance_snapshot: Dict, shard_count: int, run_id: Optional[int]
+) -> Dict[str, int]:
+    set_shard_count(shard_count)
 
-        for idx, account_data in enumerate(selected_accounts):
-            proxy = await self.get_proxy_for_account(account_data)
-            await self.run_account_modules(account_data, proxy, actions_to_perform=actions_to_perform)
-            
-            if idx < len(selected_accounts) - 1 and SLEEP_MODE:
-                await self.smart_sleep(SLEEP_TIME_ACCOUNTS[0], SLEEP_TIME_ACCOUNTS[1]) 
-            await asyncio.sleep(0)          
+    async def run():
+        runner = Runner()
+        try:
+            balances.load(balance_snapshot)
+            if run_id is not None:
+                run_journal.resume(run_id)
+            return await runner.run_accounts(planned)
+        finally:
+            await runner.close()
 
-    async def run(self, actions_to_perform: Optional[List[int]] = None) -> None:
-        if STREAM:
-            await self.run_parallel(actions_to_perform=actions_to_perform)
-        else:
-            await self.run_sequential(actions_to_perform=actions_to_perform)
+    return asyncio.run(run())
 
 
 def main():
@@ -169,6 +378,10 @@ def main():
     print('\033[32m💬 Updates and code support ➡️  https://t.me/divinus_xyz  🍀 Subscribe 🍀 \033[0m')
     print()
     try:
+        if '--resume' in sys.argv[1:]:
+            asyncio.run(Runner().run(resume=True))
+            sys.exit()
+
         while True:
             answer = select(
                 'What do you want to do?',
@@ -1,4 +1,21 @@
+from .accounts import Account, address_cache
 from .client import Client
 from .logger import logger
 from .network import Network
+from .nonce import nonces
+from .fees import fee_oracles
+from .cache import read_caches
+from .gas import gas_profiles
+from .receipts import receipt_watchers
+from .balances import balances
+from .progress import progress_store
+from .journal import run_journal, journal_item
+from .scheduler import AccountScheduler, get_proxy_host, hold_limits, released_limits, network_limits, stage_limits
+from .executor import TaskGraph
+from .sharding import run_sharded, split_shards, set_shard_count, shard_limit
+from .endpoints import endpoint_pools
+from .sessions import http_sessions
+from .explorer import explorer_cache, explorers
+from .verification import verification_queues
+from .providers import providers
 from .utils import smart_sleep, get_accounts_data
\ No newline at end of file
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+
+from eth_account import Account as EthAccount
+
+from .logger import logger
+
+
+class AddressCache:
+    def __init__(self, path: str = 'data/addresses.json'):
+        self.path = path
+        self._addresses: dict[str, str] | None = None
+        self._changed = False
+
+    @staticmethod
+    def get_key(private_key: str) -> str:
+        return hashlib.sha256(private_key.encode()).hexdigest()
+
+    def _load(self) -> dict[str, str]:
+        if self._addresses is None:
+            self._addresses = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        self._addresses = json.load(f)
+                except (json.JSONDecodeError, OSError) as e:
+                    logger.error(f"File read error {self.path}: {e}")
+        return self._addresses
+
+    def get(self, private_key: str) -> str:
+        addresses = self._load()
+        key = self.get_key(private_key)
+        if key not in addresses:
+            addresses[key] = EthAccount.from_key(private_key).address
+            self._changed = True
+        return addresses[key]
+
+    def save(self):
+        if not self._changed:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f'{self.path}.tmp', 'w') as f:
+                json.dump(self._addresses, f)
+            os.replace(f'{self.path}.tmp', self.path)
+            self._changed = False
+        except OSError as e:
+            logger.error(f"File saving error {self.path}: {e}")
+
+
+address_cache = AddressCache()
+
+
+class Account:
+    __slots__ = ('name', 'private_key', 'proxy', 'ds_auth_token', '_address')
+
+    def __init__(self, name: str, private_key: str, proxy: None | str = None, ds_auth_token: str = ''):
+        self.name = name
+        self.private_key = private_key
+        self.proxy = proxy
+        self.ds_auth_token = ds_auth_token
+        self._address: str | None = None
+
+    @property
+    def address(self) -> str:
+        if self._address is None:
+            self._address = address_cache.get(self.private_key)
+        return self._address
+
+    def __repr__(self):
+        return f'{self.name}'
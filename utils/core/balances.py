@@ -0,0 +1,53 @@
+from .logger import logger
+from .providers import providers
+from generall_settings import BALANCE_BATCH_SIZE
+
+
+class BalanceSnapshot:
+    def __init__(self):
+        self._balances: dict[tuple[int, str], int] = {}
+
+    def get(self, chain_id: int, address: str) -> int | None:
+        return self._balances.get((chain_id, address))
+
+    def invalidate(self, address: str):
+        for key in [key for key in self._balances if key[1] == address]:
+            self._balances.pop(key)
+
+    async def fetch(self, network, addresses: list[str]):
+        w3 = providers.get_w3(network)
+
+        fetched = 0
+        for start in range(0, len(addresses), BALANCE_BATCH_SIZE):
+            chunk = addresses[start:start + BALANCE_BATCH_SIZE]
+            try:
+                responses = await w3.provider.make_batch_request(
+                    [('eth_getBalance', [address, 'latest']) for address in chunk]
+                )
+            except Exception as error:
+                logger.warning(f'{network.name} | Failed to prefetch balances: {error}')
+                continue
+
+            if not isinstance(responses, list):
+                logger.warning(f'{network.name} | Failed to prefetch balances: {responses.get("error", responses)}')
+                continue
+
+            for address, response in zip(chunk, responses):
+                if response.get('result') is not None:
+                    self._balances[(network.chain_id, address)] = int(response['result'], 16)
+                    fetched += 1
+
+        logger.info(f'{network.name} | Prefetched balances: {fetched}/{len(addresses)} accounts')
+
+    def export(self, addresses: list[str]) -> dict[tuple[int, str], int]:
+        addresses = set(addresses)
+        return {key: balance for key, balance in self._balances.items() if key[1] in addresses}
+
+    def load(self, snapshot: dict[tuple[int, str], int]):
+        self._balances.update(snapshot)
+
+    def clear(self):
+        self._balances.clear()
+
+
+balances = BalanceSnapshot()
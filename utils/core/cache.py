@@ -0,0 +1,226 @@
+import asyncio
+import json
+import time
+
+from collections import OrderedDict
+from web3._utils.encoding import Web3JsonEncoder
+
+from .logger import logger
+from generall_settings import RPC_READ_CACHE_TTL, RPC_READ_CACHE_SIZE
+
+# ttl None: the answer never changes, ttl 0: only identical requests in flight share one answer
+METHOD_TTLS = {
+    'eth_chainId': None,
+    'eth_getTransactionReceipt': None,
+    'eth_blockNumber': RPC_READ_CACHE_TTL,
+    'eth_gasPrice': RPC_READ_CACHE_TTL,
+    'eth_maxPriorityFeePerGas': RPC_READ_CACHE_TTL,
+    'eth_feeHistory': RPC_READ_CACHE_TTL,
+    'eth_call': RPC_READ_CACHE_TTL,
+    'eth_getCode': RPC_READ_CACHE_TTL,
+    'eth_getBlockByNumber': RPC_READ_CACHE_TTL,
+    'eth_getBalance': 0,
+    'eth_getTransactionCount': 0,
+    'eth_estimateGas': 0,
+    'eth_getTransactionByHash': 0,
+    'eth_getBlockReceipts': 0,
+}
+
+BLOCK_TAGS = ('latest', 'pending', 'safe', 'finalized', 'earliest')
+
+
+class ReadCache:
+    def __init__(self, network):
+        self.network = network
+        self.block_number: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[str, tuple[dict, float | None, int | None]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def get_ttl(method: str, params) -> float | None:
+        ttl = METHOD_TTLS[method]
+        # a read pinned to a block number does not change
+        if method in ('eth_call', 'eth_getBlockByNumber', 'eth_getCode') and params:
+            block = params[-1] if method != 'eth_getBlockByNumber' else params[0]
+            if isinstance(block, str) and block.startswith('0x') and block not in BLOCK_TAGS:
+                return None
+        return ttl
+
+    def on_new_block(self, block_number: int):
+        if self.block_number is None or block_number > self.block_number:
+            self.block_number = block_number
+
+    def _get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        response, expires_at, block_number = entry
+        if expires_at is not None and (time.monotonic() > expires_at or block_number != self.block_number):
+            self._entries.pop(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    def _store(self, key: str, method: str, params, response: dict):
+        if not isinstance(response, dict) or 'error' in response or response.get('result') is None:
+            return
+
+        if method == 'eth_blockNumber':
+            self.on_new_block(int(response['result'], 16))
+
+        ttl = self.get_ttl(method, params)
+        if ttl == 0:
+            return
+
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (response, expires_at, self.block_number)
+        self._entries.move_to_end(key)
+        while len(self._entries) > RPC_READ_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def get_key(method: str, params) -> str:
+        return f'{method}:{json.dumps(params, cls=Web3JsonEncoder, sort_keys=True)}'
+
+    async def request(self, method: str, params, send):
+        if method not in METHOD_TTLS:
+            return await send()
+
+        key = self.get_key(method, params)
+        response = self._get(key)
+        if response is not None:
+            self.hits += 1
+            return dict(response)
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return dict(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # the request this one was waiting for was cancelled, not this one
+                if future.cancelled():
+                    return await self.request(method, params, send)
+                raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await send()
+        except BaseException as error:
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                # waiters, if any, get the error from the future; nobody may be waiting
+                future.exception()
+            raise
+        else:
+            future.set_result(response)
+            self._store(key, method, params, response)
+            return response
+        finally:
+            self._in_flight.pop(key, None)
+
+
+    def _fail(self, owned, error: BaseException):
+        for key, future in owned:
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                future.exception()
+            if self._in_flight.get(key) is future:
+                self._in_flight.pop(key)
+
+    async def batch_request(self, requests: list, send):
+        # each read of a batch is served like a single one, only the misses go to the node
+        responses: list = [None] * len(requests)
+        waiting: dict[int, asyncio.Future] = {}
+        owned: dict[int, tuple[str, asyncio.Future]] = {}
+        misses: list[int] = []
+
+        for index, (method, params) in enumerate(requests):
+            if method not in METHOD_TTLS:
+                misses.append(index)
+                continue
+
+            key = self.get_key(method, params)
+            response = self._get(key)
+            if response is not None:
+                self.hits += 1
+                responses[index] = dict(response)
+            elif key in self._in_flight:
+                self.coalesced += 1
+                waiting[index] = self._in_flight[key]
+            else:
+                self.misses += 1
+                future = asyncio.get_running_loop().create_future()
+                self._in_flight[key] = future
+                owned[index] = key, future
+                misses.append(index)
+
+        try:
+            sent = await send([requests[index] for index in misses]) if misses else []
+        except BaseException as error:
+            self._fail(owned.values(), error)
+            raise
+
+        if not isinstance(sent, list):
+            # the whole batch was rejected, the caller reports it as before
+            self._fail(owned.values(), ConnectionError(f'Batch request failed: {sent}'))
+            return sent
+
+        for index, response in zip(misses, sent):
+            responses[index] = response
+            if index in owned:
+                key, future = owned.pop(index)
+                future.set_result(response)
+                self._store(key, *requests[index], response)
+                self._in_flight.pop(key, None)
+        self._fail(owned.values(), ConnectionError('No response in the batch'))
+
+        for index, future in waiting.items():
+            try:
+                responses[index] = dict(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                responses[index] = await self._resend(requests[index], send)
+            except Exception:
+                responses[index] = await self._resend(requests[index], send)
+        return responses
+
+    @staticmethod
+    async def _resend(request: tuple, send) -> dict:
+        # the request this read was waiting for failed, the read is sent on its own
+        response = await send([request])
+        return response[0] if isinstance(response, list) else response
+
+
+class ReadCaches:
+    def __init__(self):
+        self._caches: dict[int, ReadCache] = {}
+
+    def get(self, network) -> ReadCache:
+        if network.chain_id not in self._caches:
+            self._caches[network.chain_id] = ReadCache(network)
+        return self._caches[network.chain_id]
+
+    def clear(self):
+        for cache in self._caches.values():
+            if cache.hits or cache.misses or cache.coalesced:
+                logger.info(
+                    f'{cache.network.name} | RPC reads: {cache.misses} sent | {cache.hits} from cache | '
+                    f'{cache.coalesced} joined a request in flight'
+                )
+        self._caches.clear()
+
+
+read_caches = ReadCaches()
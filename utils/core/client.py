@@ -1,15 +1,28 @@
 import asyncio
 import random
+import rlp
 
+from contextlib import nullcontext
+
+from eth_utils import keccak
 from web3.contract import AsyncContract
-from web3.exceptions import TransactionNotFound, TimeExhausted
-from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3 import AsyncWeb3
 from web3.datastructures import AttributeDict
 
 
 from .network import Network
+from .accounts import Account
 from .logger import logger
+from .providers import providers
+from .nonce import nonces
+from .fees import fee_oracles
+from .receipts import receipt_watchers
+from .balances import balances
+from .gas import gas_profiles
+from .journal import run_journal
+from .scheduler import released_limits
 from data.config import ERC20_ABI, NETWORK_TOKEN_CONTRACTS
+from generall_settings import PIPELINE_TRANSACTIONS
 
 
 class BlockchainException(Exception):
@@ -20,20 +33,16 @@ class SoftwareException(Exception):
 
 
 class Client():
-    def __init__(
-            self, network: Network, private_key: str, name: str,
-            proxy: None | str = None, ds_auth_token: None | str = None
-        ):
-        self.name = name
+    def __init__(self, network: Network, account: Account):
+        self.account = account
+        self.name = account.name
         self.network: Network = network
-        self.proxy_init = proxy
-        self.rpc = random.choice(self.network.rpc)
-        self.request_kwargs = {"proxy": f'{proxy}', "verify_ssl": False} if proxy else {"verify_ssl": False}
-        self.w3 = AsyncWeb3(AsyncHTTPProvider(self.rpc, request_kwargs=self.request_kwargs))
-        self.private_key = private_key
-        self.address = AsyncWeb3.to_checksum_address(self.w3.eth.account.from_key(private_key).address)
+        self.proxy_init = account.proxy or None
+        self.w3 = providers.get_w3(self.network, self.proxy_init)
+        self.private_key = account.private_key
+        self.address = account.address
 
-        self.ds_auth_token = ds_auth_token
+        self.ds_auth_token = account.ds_auth_token
 
     @staticmethod
     def get_user_agent():
@@ -62,10 +71,9 @@ class Client():
     async def change_rpc(self):
         logger.warning(f'Replacing RPC | {self.address}')
 
-        if len(self.network.rpc) != 1:
-            rpcs_list = [rpc for rpc in self.network.rpc if rpc != self.rpc]
-            new_rpc = random.choice(rpcs_list)
-            self.w3 = AsyncWeb3(AsyncHTTPProvider(new_rpc, request_kwargs=self.request_kwargs))
+        pool = self.w3.provider.pool
+        if len(pool.endpoints) > 1:
+            pool.eject(pool.best())
             logger.success(f'The RPC replacement was a success! | {self.address}')
         else:
             logger.error(f'Failed to change RPC | {self.address}')
@@ -86,8 +94,20 @@ class Client():
     
     async def get_token_balance(self, token: str = None, check_native: bool = False) -> int | None:
         if check_native:
-            token_balance = await self.w3.eth.get_balance(self.address)
-            return token_balance or None
+            balance = balances.get(self.network.chain_id, self.address)
+            if balance is not None:
+                return balance or None
+
+            requests = [('eth_getBalance', [self.address, 'latest'])]
+            if not nonces.is_synced(self.network.chain_id, self.address):
+                requests.append(('eth_getTransactionCount', [self.address, 'pending']))
+
+            balance, *nonce = await self.batch_request(requests)
+            if isinstance(balance, BlockchainException):
+                raise balance
+            if nonce and not isinstance(nonce[0], BlockchainException):
+                nonces.sync(self.network.chain_id, self.address, int(nonce[0], 16))
+            return int(balance, 16) or None
         contract = await self.get_contract(NETWORK_TOKEN_CONTRACTS[token])
         token_balance = await contract.functions.balanceOf(self.address).call()
         return token_balance or None
@@ -99,83 +119,231 @@ class Client():
             spender_address
         ).call()
     
-    async def get_priotiry_fee(self):
-        fee_history = await self.w3.eth.fee_history(25, 'latest', [20.0])
-        non_empty_block_priority_fees = [fee[0] for fee in fee_history["reward"] if fee[0] != 0]
+    async def batch_request(self, requests: list[tuple[str, list]]) -> list:
+        try:
+            responses = await self.w3.provider.make_batch_request(requests)
+        except Exception as error:
+            raise BlockchainException(f'{self.get_normalize_error(error)}')
+
+        if isinstance(responses, dict):
+            raise BlockchainException(f'{responses.get("error", responses)}')
+
+        results = []
+        for response in responses:
+            if response.get('error'):
+                error = response['error']
+                message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+                # revert data carries the custom error selector
+                if isinstance(error, dict) and error.get('data'):
+                    message = f"{message}: {error['data']}"
+                results.append(BlockchainException(message))
+            else:
+                results.append(response.get('result'))
+        return results
+
+    @staticmethod
+    def calc_priority_fee(rewards: list) -> int:
+        non_empty_block_priority_fees = [fee[0] for fee in rewards if fee[0] != 0]
 
         divisor_priority = max(len(non_empty_block_priority_fees), 1)
 
-        priority_fee = int(round(sum(non_empty_block_priority_fees) / divisor_priority))
+        return int(round(sum(non_empty_block_priority_fees) / divisor_priority))
 
-        return priority_fee
+    async def get_priotiry_fee(self):
+        fee_history = await self.w3.eth.fee_history(25, 'latest', [20.0])
+        return self.calc_priority_fee(fee_history["reward"])
     
-    async def prepare_transaction(self, value: int = 0):
+    @staticmethod
+    def get_estimate_params(tx_params: dict) -> dict:
+        estimate_params = {'from': tx_params['from'], 'value': hex(tx_params['value'])}
+        if 'to' in tx_params:
+            estimate_params['to'] = tx_params['to']
+        if 'data' in tx_params:
+            data = tx_params['data']
+            estimate_params['data'] = data if isinstance(data, str) else '0x' + data.hex()
+        return estimate_params
+
+    async def prepare_transaction(self, value: int = 0, to: str = None, data: str | bytes = None):
+        tx_params = {
+            'from': self.address,
+            'value': value,
+            'chainId': self.network.chain_id
+        }
+        if to is not None:
+            tx_params['to'] = to
+        if data is not None:
+            tx_params['data'] = data
+
+        requests = {}
+        if not nonces.is_synced(self.network.chain_id, self.address):
+            requests['nonce'] = ('eth_getTransactionCount', [self.address, 'pending'])
+        # repeated transactions take their limit from past receipts and skip the estimate
+        gas_limit = gas_profiles.get_limit(self.network.chain_id, to, data)
+        if gas_limit is not None:
+            tx_params['gas'] = gas_limit
+        elif to is not None or data is not None:
+            requests['gas'] = ('eth_estimateGas', [self.get_estimate_params(tx_params)])
+
+        results = {}
         try:
-            tx_params = {
-                'from': self.address,
-                'nonce': await self.w3.eth.get_transaction_count(self.address),
-                'value': value,
-                'chainId': self.network.chain_id
-            }
+            if requests:
+                fees, batch_results = await asyncio.gather(
+                    fee_oracles.get(self.network).get_fees(self),
+                    self.batch_request(list(requests.values()))
+                )
+                results = dict(zip(requests, batch_results))
+            else:
+                fees = await fee_oracles.get(self.network).get_fees(self)
+
+            if isinstance(results.get('nonce'), BlockchainException):
+                raise results['nonce']
+            if 'nonce' in results:
+                nonces.sync(self.network.chain_id, self.address, int(results['nonce'], 16))
+
             if self.network.eip1559_support:
-                base_fee = await self.w3.eth.gas_price
-                max_priority_fee_per_gas = await self.get_priotiry_fee()
-                max_fee_per_gas = base_fee + max_priority_fee_per_gas
+                max_priority_fee_per_gas = fees['priority_fee']
+                max_fee_per_gas = fees['gas_price'] + max_priority_fee_per_gas
                 tx_params['maxPriorityFeePerGas'] = max_priority_fee_per_gas
                 tx_params['maxFeePerGas'] = int(max_fee_per_gas * 1.25)
                 tx_params['type'] = '0x2'
             else:
-                tx_params['gasPrice'] = int(await self.w3.eth.gas_price * 1.25)
+                tx_params['gasPrice'] = int(fees['gas_price'] * 1.25)
 
-            return tx_params
+            # a failed estimate is left to send_transaction, which reports it as before
+            estimated_gas = results.get('gas')
+            if estimated_gas is not None and not isinstance(estimated_gas, BlockchainException):
+                tx_params['gas'] = min(int(int(estimated_gas, 16) * 1.25), 10_000_000)
+        except BlockchainException:
+            raise
         except Exception as error:
             raise BlockchainException(f'{self.get_normalize_error(error)}')
+
+        tx_params['nonce'] = nonces.reserve(self.network.chain_id, self.address)
+
+        return tx_params
         
-    async def send_transaction(self, transaction, need_hash: bool = False, without_gas: bool = False,
-                            poll_latency: int = 10, timeout: int = 360):
+    async def sync_nonce(self):
+        chain_nonce = await self.w3.eth.get_transaction_count(self.address, 'pending')
+        nonces.sync(self.network.chain_id, self.address, chain_nonce)
+
+    @staticmethod
+    def get_create_address(sender: str, nonce: int) -> str:
+        contract_address = keccak(rlp.encode([bytes.fromhex(sender[2:]), nonce]))[12:]
+        return AsyncWeb3.to_checksum_address(contract_address)
+
+    async def release_nonce(self, transaction: dict):
+        if 'nonce' not in transaction:
+            return
+        if nonces.release(self.network.chain_id, self.address, transaction['nonce']):
+            await self.fill_nonce_gap(transaction['nonce'])
+
+    async def fill_nonce_gap(self, nonce: int):
+        # transactions already sent with later nonces wait in the mempool until this one is used
+        try:
+            transaction = await self.prepare_transaction(to=self.address)
+        except Exception as error:
+            logger.error(f'Failed to fill nonce {nonce}: {self.get_normalize_error(error)} | {self.address}')
+            nonces.forget(self.network.chain_id, self.address)
+            return
+
+        if transaction['nonce'] > nonce:
+            # another transaction has taken the nonce in the meantime
+            nonces.release(self.network.chain_id, self.address, transaction['nonce'])
+            return
+
+        logger.warning(f'Nonce {transaction["nonce"]} was not used, filling it with an empty transfer | {self.address}')
+        transaction.setdefault('gas', 21000)
         try:
-            estimated_gas = await self.w3.eth.estimate_gas(transaction)
-            transaction['gas'] = min(int(estimated_gas * 1.25), 10_000_000)
+            await self.sign_and_send(transaction)
         except Exception as error:
             normalized_error = self.get_normalize_error(error)
-            logger.error(f'Failed to estimate gas: {normalized_error} | {self.address}')
-            return False
+            if 'nonce too low' in str(normalized_error).lower():
+                # the gap is already filled
+                return
+            logger.error(f'Failed to fill nonce {nonce}: {normalized_error} | {self.address}')
+            nonces.forget(self.network.chain_id, self.address)
+            return
+
+        balances.invalidate(self.address)
+
+    async def sign_and_send(self, transaction: dict):
+        signed_tx = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+        return await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+    async def submit_transaction(self, transaction: dict):
+        if 'gas' not in transaction:
+            try:
+                estimated_gas = await self.w3.eth.estimate_gas(transaction)
+                transaction['gas'] = min(int(estimated_gas * 1.25), 10_000_000)
+            except Exception as error:
+                normalized_error = self.get_normalize_error(error)
+                logger.error(f'Failed to estimate gas: {normalized_error} | {self.address}')
+                await self.release_nonce(transaction)
+                return False
 
         try:
-            signed_tx = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            tx_hash = await self.sign_and_send(transaction)
         except Exception as error:
             normalized_error = self.get_normalize_error(error)
-            logger.error(f'Failed to send transaction: {normalized_error} | {self.address}')
-            return False
+            if 'nonce too low' not in str(normalized_error).lower():
+                logger.error(f'Failed to send transaction: {normalized_error} | {self.address}')
+                await self.release_nonce(transaction)
+                return False
+
+            logger.warning(f'Nonce {transaction["nonce"]} is already used, syncing with the network | {self.address}')
+            try:
+                await self.sync_nonce()
+                transaction['nonce'] = nonces.reserve(self.network.chain_id, self.address)
+                tx_hash = await self.sign_and_send(transaction)
+            except Exception as error:
+                normalized_error = self.get_normalize_error(error)
+                logger.error(f'Failed to send transaction: {normalized_error} | {self.address}')
+                await self.release_nonce(transaction)
+                return False
+
+        run_journal.record_transaction(self.network.chain_id, AsyncWeb3.to_hex(tx_hash), transaction['nonce'])
+        balances.invalidate(self.address)
 
+        for nonce in nonces.mark_sent(self.network.chain_id, self.address, transaction['nonce']):
+            await self.fill_nonce_gap(nonce)
+        return tx_hash
+
+    async def wait_for_transaction(self, transaction: dict, tx_hash, timeout: int = 360, need_hash: bool = False,
+                                   need_receipt: bool = False):
         try:
-            total_time = 0
-            while True:
-                try:
-                    receipts = await self.w3.eth.get_transaction_receipt(tx_hash)
-                    status = receipts.get("status") if isinstance(receipts, dict) else receipts["status"]
-                    
-                    if status == 1:
-                        logger.success(f'Transaction successful: {self.network.explorer}/tx/{tx_hash.hex()} | {self.address}')
-                        return tx_hash if need_hash else True
-                    elif status is None:
-                        await asyncio.sleep(poll_latency)
-                    else:
-                        logger.error(f'Transaction failed: {self.network.explorer}/tx/{tx_hash.hex()}')
-                        return False
-                except TransactionNotFound:
-                    if total_time > timeout:
-                        logger.error(f'Transaction not found after {timeout} seconds')
-                        return False
-                    total_time += poll_latency
-                    await asyncio.sleep(poll_latency)
-                except Exception as error:
-                    normalized_error = self.get_normalize_error(error)
-                    logger.error(f'Error checking transaction status: {normalized_error} | {self.address}')
-                    total_time += poll_latency
-                    await asyncio.sleep(poll_latency)
+            async with released_limits() if PIPELINE_TRANSACTIONS else nullcontext():
+                receipt = await receipt_watchers.get(self.network).wait_for_receipt(
+                    self, AsyncWeb3.to_hex(tx_hash), timeout
+                )
+        except asyncio.TimeoutError:
+            # a dropped transaction leaves a gap that the nonces reserved after it cannot fill
+            nonces.forget(self.network.chain_id, self.address)
+            logger.error(f'Transaction not found after {timeout} seconds')
+            return False
         except Exception as error:
             normalized_error = self.get_normalize_error(error)
             logger.error(f'Unexpected error during transaction: {normalized_error} | {self.address}')
             return False
+
+        if int(receipt['status'], 16) == 1:
+            gas_profiles.record(
+                self.network.chain_id, transaction.get('to'), transaction.get('data'), int(receipt['gasUsed'], 16)
+            )
+            logger.success(f'Transaction successful: {self.network.explorer}/tx/{tx_hash.hex()} | {self.address}')
+            if need_receipt:
+                return receipt
+            return tx_hash if need_hash else True
+
+        gas_profiles.forget(self.network.chain_id, transaction.get('to'), transaction.get('data'))
+        logger.error(f'Transaction failed: {self.network.explorer}/tx/{tx_hash.hex()}')
+        return False
+
+    async def send_transaction(self, transaction, need_hash: bool = False, without_gas: bool = False,
+                            timeout: int = 360, need_receipt: bool = False):
+        tx_hash = await self.submit_transaction(transaction)
+        if not tx_hash:
+            return False
+
+        return await self.wait_for_transaction(
+            transaction, tx_hash, timeout, need_hash=need_hash, need_receipt=need_receipt
+        )
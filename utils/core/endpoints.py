@@ -0,0 +1,76 @@
+import time
+
+from generall_settings import RPC_EJECT_AFTER_FAILURES, RPC_EJECT_TIME
+
+SUPPORTED_SCHEMES = ('http://', 'https://', 'ws://', 'wss://')
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    @property
+    def is_ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    @property
+    def score(self) -> float:
+        if self.latency is None:
+            # untried endpoints go first so every endpoint gets measured
+            return 0.0 if not self.error_rate else float('inf')
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def __repr__(self):
+        return f'{self.url}'
+
+
+class EndpointPool:
+    def __init__(self, network):
+        self.network = network
+        self.endpoints = [Endpoint(url) for url in network.rpc if url.startswith(SUPPORTED_SCHEMES)]
+
+    def ranked(self) -> list[Endpoint]:
+        healthy = sorted((endpoint for endpoint in self.endpoints if not endpoint.is_ejected), key=lambda e: e.score)
+        if healthy:
+            return healthy
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.ejected_until)
+
+    def best(self) -> Endpoint:
+        return self.ranked()[0]
+
+    def record_success(self, endpoint: Endpoint, latency: float):
+        endpoint.latency = latency if endpoint.latency is None else 0.7 * endpoint.latency + 0.3 * latency
+        endpoint.error_rate *= 0.7
+        endpoint.failures = 0
+        endpoint.ejections = 0
+
+    def record_failure(self, endpoint: Endpoint):
+        endpoint.error_rate = 0.7 * endpoint.error_rate + 0.3
+        endpoint.failures += 1
+
+        if endpoint.failures >= RPC_EJECT_AFTER_FAILURES:
+            self.eject(endpoint)
+
+    def eject(self, endpoint: Endpoint):
+        # an endpoint comes back after the timeout and is ejected for twice as long if it fails again
+        endpoint.ejected_until = time.monotonic() + RPC_EJECT_TIME * 2 ** min(endpoint.ejections, 5)
+        endpoint.ejections += 1
+        endpoint.failures = RPC_EJECT_AFTER_FAILURES - 1
+
+
+class EndpointPools:
+    def __init__(self):
+        self._pools: dict[int, EndpointPool] = {}
+
+    def get(self, network) -> EndpointPool:
+        if network.chain_id not in self._pools:
+            self._pools[network.chain_id] = EndpointPool(network)
+        return self._pools[network.chain_id]
+
+
+endpoint_pools = EndpointPools()
@@ -0,0 +1,43 @@
+import asyncio
+
+from .logger import logger
+from .scheduler import hold_limits
+
+
+class TaskGraph:
+    def __init__(self, actions: list[int], dependencies: dict[int, set[int]]):
+        self.actions = list(dict.fromkeys(actions))
+        # a dependency only matters when it is part of the same run
+        self.dependencies = {
+            action: dependencies.get(action, set()) & set(self.actions) for action in self.actions
+        }
+
+    async def run(self, execute, limit: int = 1, delay=None) -> dict[int, object]:
+        results: dict[int, object] = {}
+        finished = {action: asyncio.Event() for action in self.actions}
+        semaphore = asyncio.Semaphore(max(limit, 1))
+        started = 0
+
+        async def run_action(action: int):
+            nonlocal started
+            try:
+                for dependency in self.dependencies[action]:
+                    await finished[dependency].wait()
+
+                failed = [dependency for dependency in self.dependencies[action] if results[dependency] is False]
+                if failed:
+                    logger.warning(f"Task {action} is skipped because task {failed[0]} failed")
+                    results[action] = False
+                    return
+
+                async with hold_limits(semaphore):
+                    started += 1
+                    if delay is not None and started > 1:
+                        await delay()
+                    results[action] = await execute(action)
+            finally:
+                results.setdefault(action, False)
+                finished[action].set()
+
+        await asyncio.gather(*(run_action(action) for action in self.actions))
+        return results
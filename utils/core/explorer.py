@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import time
+
+from urllib.parse import urlencode
+
+from .sessions import http_sessions
+from generall_settings import EXPLORER_CACHE_TTL, EXPLORER_NEGATIVE_TTL, EXPLORER_MAX_PAGES
+
+
+class ExplorerException(Exception):
+    pass
+
+
+class ExplorerCache:
+    def __init__(self, path: str = 'data/explorer_cache.db'):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT NOT NULL)'
+            )
+            self._connection.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+        return self._connection
+
+    def get(self, key: str) -> dict | None:
+        # entries are read one by one, the cache is never loaded as a whole
+        row = self.connection.execute('SELECT expires_at, value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[0] is not None and row[0] <= time.time()):
+            return None
+        return json.loads(row[1])
+
+    def set(self, key: str, data, ttl: float | None):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)',
+            (key, None if ttl is None else time.time() + ttl, json.dumps({'data': data}))
+        )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+
+explorer_cache = ExplorerCache()
+
+
+class ExplorerClient:
+    def __init__(self, network):
+        self.network = network
+        self.api_url = f"{network.explorer.rstrip('/')}/api/v2"
+
+    def get_cache_key(self, path: str, params: dict | None = None) -> str:
+        return f'{self.api_url}{path}?{urlencode(sorted((params or {}).items()))}'
+
+    @staticmethod
+    def is_empty(data) -> bool:
+        return data is None or (isinstance(data, dict) and 'items' in data and not data['items'])
+
+    async def get(
+            self, path: str, params: dict | None = None, ttl: float | None = EXPLORER_CACHE_TTL,
+            proxy: None | str = None, is_empty=None, cached: bool = True, reduce=None
+    ):
+        # ttl=None marks data that never changes once the explorer has it
+        key = self.get_cache_key(path, params)
+        entry = explorer_cache.get(key) if cached else None
+        if entry is not None:
+            return entry['data']
+
+        response = await http_sessions.get(url=f'{self.api_url}{path}', params=params, proxy=proxy)
+        if response.status_code == 404:
+            data = None
+        elif response.status_code != 200:
+            raise ExplorerException(f'Request error: {response.status_code}')
+        else:
+            data = response.json()
+
+        # only the fields the caller reads are kept
+        if reduce is not None:
+            data = reduce(data)
+
+        if (is_empty or self.is_empty)(data):
+            ttl = EXPLORER_NEGATIVE_TTL
+        explorer_cache.set(key, data, ttl)
+        return data
+
+    async def iter_items(
+            self, path: str, params: dict | None = None, ttl: float | None = EXPLORER_CACHE_TTL,
+            proxy: None | str = None, reduce_item=None
+    ):
+        def reduce(data):
+            if not isinstance(data, dict) or reduce_item is None:
+                return data
+            return {
+                'items': [reduce_item(item) for item in data.get('items', [])],
+                'next_page_params': data.get('next_page_params')
+            }
+
+        page_params = dict(params or {})
+        for _ in range(EXPLORER_MAX_PAGES):
+            data = await self.get(path, page_params, ttl=ttl, proxy=proxy, reduce=reduce)
+            if self.is_empty(data):
+                return
+
+            for item in data.get('items', []):
+                yield item
+
+            if not data.get('next_page_params'):
+                return
+            page_params = {**(params or {}), **data['next_page_params']}
+
+    async def is_verified(self, address: str, proxy: None | str = None, cached: bool = True) -> bool:
+        # a verified contract stays verified, an unverified one is asked again after the negative ttl
+        return await self.get(
+            f'/smart-contracts/{address}', ttl=None, proxy=proxy, is_empty=lambda verified: not verified,
+            cached=cached, reduce=lambda data: bool((data or {}).get('is_verified'))
+        )
+
+
+class Explorers:
+    def __init__(self):
+        self._explorers: dict[int, ExplorerClient] = {}
+
+    def get(self, network) -> ExplorerClient:
+        if network.chain_id not in self._explorers:
+            self._explorers[network.chain_id] = ExplorerClient(network)
+        return self._explorers[network.chain_id]
+
+
+explorers = Explorers()
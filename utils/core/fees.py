@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from generall_settings import FEE_ORACLE_TTL
+
+
+class FeeOracle:
+    def __init__(self, network):
+        self.network = network
+        self.block_number: int | None = None
+        self._fees: dict | None = None
+        self._updated_at = 0.0
+        self._refresh_task: asyncio.Future | None = None
+
+    def is_fresh(self) -> bool:
+        return self._fees is not None and time.monotonic() - self._updated_at < FEE_ORACLE_TTL
+
+    def on_new_block(self, block_number: int):
+        if self.block_number is not None and block_number > self.block_number:
+            self._updated_at = 0.0
+
+    async def get_fees(self, client) -> dict:
+        if self.is_fresh():
+            return self._fees
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh(client))
+
+        return await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self, client) -> dict:
+        requests = [('eth_blockNumber', []), ('eth_gasPrice', [])]
+        if self.network.eip1559_support:
+            requests.append(('eth_feeHistory', [hex(25), 'latest', [20.0]]))
+
+        results = await client.batch_request(requests)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+        fees = {'gas_price': int(results[1], 16)}
+        if self.network.eip1559_support:
+            fees['priority_fee'] = client.calc_priority_fee(
+                [[int(fee, 16) for fee in reward] for reward in results[2]['reward']]
+            )
+
+        self.block_number = int(results[0], 16)
+        self._fees = fees
+        self._updated_at = time.monotonic()
+        return fees
+
+
+class FeeOracles:
+    def __init__(self):
+        self._oracles: dict[int, FeeOracle] = {}
+
+    def get(self, network) -> FeeOracle:
+        if network.chain_id not in self._oracles:
+            self._oracles[network.chain_id] = FeeOracle(network)
+        return self._oracles[network.chain_id]
+
+    def clear(self):
+        self._oracles.clear()
+
+
+fee_oracles = FeeOracles()
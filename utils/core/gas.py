@@ -0,0 +1,69 @@
+import time
+
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from .progress import progress_store
+from generall_settings import GAS_PROFILE_HEADROOM, GAS_PROFILE_MAX_ENTRIES
+
+
+class GasProfiles:
+    def __init__(self):
+        self.scope = 'gas_profiles'
+        self._codes: dict[tuple[int, str], str] = {}
+
+    @staticmethod
+    def get_nonzero(data: bytes) -> int:
+        return len(data) - data.count(0)
+
+    def register_code(self, chain_id: int, address: str, code: str | bytes):
+        # contracts deployed by every account from the same bytecode share one profile
+        self._codes[(chain_id, address.lower())] = keccak(HexBytes(code)).hex()[:16]
+
+    def get_key(self, chain_id: int, to: str | None, data: str | bytes | None) -> str:
+        raw_data = bytes(HexBytes(data)) if data else b''
+        if to is None:
+            return f'{chain_id}:create:{keccak(raw_data).hex()[:16]}'
+        target = self._codes.get((chain_id, to.lower()), to.lower())
+        return f'{chain_id}:{target}:{raw_data[:4].hex()}:{(len(raw_data) + 31) // 32}'
+
+    def get_limit(self, chain_id: int, to: str | None, data: str | bytes | None) -> int | None:
+        profile = progress_store.get(self.scope, self.get_key(chain_id, to, data))
+        if not profile:
+            return None
+
+        # arguments of the same size can cost more, a string of 32 bytes takes one more slot than 31
+        raw_data = bytes(HexBytes(data)) if data else b''
+        if self.get_nonzero(raw_data) > profile.get('nonzero', 0):
+            return None
+        return int(profile['gas_used'] * GAS_PROFILE_HEADROOM)
+
+    def record(self, chain_id: int, to: str | None, data: str | bytes | None, gas_used: int):
+        key = self.get_key(chain_id, to, data)
+        profile = progress_store.get(self.scope, key)
+        if profile is None:
+            profile = {'gas_used': 0, 'samples': 0, 'nonzero': 0}
+            self._evict()
+
+        raw_data = bytes(HexBytes(data)) if data else b''
+        progress_store.set(self.scope, key, {
+            'gas_used': max(profile['gas_used'], gas_used),
+            'samples': profile['samples'] + 1,
+            'nonzero': max(profile.get('nonzero', 0), self.get_nonzero(raw_data)),
+            'updated_at': time.time()
+        })
+
+    def _evict(self):
+        keys = progress_store.keys(self.scope)
+        if len(keys) < GAS_PROFILE_MAX_ENTRIES:
+            return
+
+        profiles = sorted(keys, key=lambda key: progress_store.get(self.scope, key).get('updated_at', 0))
+        for key in profiles[:len(keys) - GAS_PROFILE_MAX_ENTRIES + 1]:
+            progress_store.delete(self.scope, key)
+
+    def forget(self, chain_id: int, to: str | None, data: str | bytes | None):
+        progress_store.delete(self.scope, self.get_key(chain_id, to, data))
+
+
+gas_profiles = GasProfiles()
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import time
+
+from contextvars import ContextVar
+
+
+journal_item: ContextVar[tuple[str, int] | None] = ContextVar('journal_item', default=None)
+
+
+class RunJournal:
+    def __init__(self, path: str = 'data/journal.db'):
+        self.path = path
+        self.run_id: int | None = None
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS runs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL NOT NULL, finished_at REAL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS items ('
+                'run_id INTEGER NOT NULL, address TEXT NOT NULL, action INTEGER NOT NULL, '
+                'state TEXT NOT NULL, updated_at REAL NOT NULL, '
+                'chain_id INTEGER, tx_hash TEXT, nonce INTEGER, '
+                'PRIMARY KEY (run_id, address, action))'
+            )
+        return self._connection
+
+    def start(self, planned: list[tuple[str, list[int]]]):
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            # a new run replaces the one that could have been resumed
+            self.connection.execute('UPDATE runs SET finished_at = ? WHERE finished_at IS NULL', (now,))
+            self.run_id = self.connection.execute('INSERT INTO runs (started_at) VALUES (?)', (now,)).lastrowid
+            self.connection.executemany(
+                'INSERT INTO items (run_id, address, action, state, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(self.run_id, address, action, 'planned', now) for address, actions in planned for action in actions]
+            )
+
+    def get_unfinished(self) -> tuple[int, list[tuple[str, list[int]]]] | None:
+        row = self.connection.execute(
+            'SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1'
+        ).fetchone()
+        if row is None:
+            return None
+
+        # tasks that were running when the process stopped are done again
+        rows = self.connection.execute(
+            "SELECT address, action FROM items WHERE run_id = ? AND state IN ('planned', 'running') ORDER BY rowid",
+            (row[0],)
+        ).fetchall()
+
+        work: dict[str, list[int]] = {}
+        for address, action in rows:
+            work.setdefault(address, []).append(action)
+        return row[0], list(work.items())
+
+    def resume(self, run_id: int):
+        self.run_id = run_id
+
+    def mark(self, address: str, action: int, state: str):
+        if self.run_id is None:
+            return
+        self.connection.execute(
+            'UPDATE items SET state = ?, updated_at = ? WHERE run_id = ? AND address = ? AND action = ?',
+            (state, time.time(), self.run_id, address, action)
+        )
+
+    def record_transaction(self, chain_id: int, tx_hash: str, nonce: int):
+        # the last transaction a task has sent, so a resumed run can tell if it already landed
+        item = journal_item.get()
+        if self.run_id is None or item is None:
+            return
+        self.connection.execute(
+            'UPDATE items SET chain_id = ?, tx_hash = ?, nonce = ?, updated_at = ? '
+            'WHERE run_id = ? AND address = ? AND action = ?',
+            (chain_id, tx_hash, nonce, time.time(), self.run_id, *item)
+        )
+
+    def get_transaction(self, address: str, action: int) -> tuple[int, str, int] | None:
+        row = self.connection.execute(
+            "SELECT chain_id, tx_hash, nonce FROM items "
+            "WHERE run_id = ? AND address = ? AND action = ? AND state = 'running' AND tx_hash IS NOT NULL",
+            (self.run_id, address, action)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def finish(self):
+        if self.run_id is None:
+            return
+        # a run with tasks left, e.g. ones whose transaction could not be checked, stays open for --resume
+        self.connection.execute(
+            "UPDATE runs SET finished_at = ? WHERE id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM items WHERE run_id = ? AND state IN ('planned', 'running'))",
+            (time.time(), self.run_id, self.run_id)
+        )
+        self.run_id = None
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self.run_id = None
+
+
+run_journal = RunJournal()
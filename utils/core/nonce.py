@@ -0,0 +1,60 @@
+import heapq
+
+
+class NonceManager:
+    def __init__(self):
+        self._next: dict[tuple[int, str], int] = {}
+        self._released: dict[tuple[int, str], list[int]] = {}
+        self._sent: dict[tuple[int, str], int] = {}
+
+    def is_synced(self, chain_id: int, address: str) -> bool:
+        return (chain_id, address) in self._next
+
+    def sync(self, chain_id: int, address: str, chain_nonce: int):
+        key = (chain_id, address)
+        self._next[key] = max(self._next.get(key, 0), chain_nonce)
+
+        released = [nonce for nonce in self._released.get(key, []) if nonce >= chain_nonce]
+        heapq.heapify(released)
+        self._released[key] = released
+
+    def reserve(self, chain_id: int, address: str) -> int:
+        key = (chain_id, address)
+        released = self._released.get(key)
+        if released:
+            return heapq.heappop(released)
+
+        nonce = self._next[key]
+        self._next[key] = nonce + 1
+        return nonce
+
+    def release(self, chain_id: int, address: str, nonce: int) -> bool:
+        key = (chain_id, address)
+        if key not in self._next:
+            return False
+
+        if nonce == self._next[key] - 1:
+            self._next[key] = nonce
+            return False
+
+        heapq.heappush(self._released.setdefault(key, []), nonce)
+        # a gap only blocks the account once a later nonce is broadcast
+        return nonce < self._sent.get(key, -1)
+
+    def mark_sent(self, chain_id: int, address: str, nonce: int) -> list[int]:
+        key = (chain_id, address)
+        self._sent[key] = max(self._sent.get(key, -1), nonce)
+        return sorted(released for released in self._released.get(key, []) if released < nonce)
+
+    def forget(self, chain_id: int, address: str):
+        self._next.pop((chain_id, address), None)
+        self._released.pop((chain_id, address), None)
+        self._sent.pop((chain_id, address), None)
+
+    def clear(self):
+        self._next.clear()
+        self._released.clear()
+        self._sent.clear()
+
+
+nonces = NonceManager()
@@ -0,0 +1,110 @@
+import copy
+import json
+import os
+import sqlite3
+
+from .logger import logger
+
+
+class ProgressStore:
+    def __init__(self, path: str = 'data/progress.db'):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._cache: dict[str, dict[str, object]] = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS progress ('
+                'scope TEXT NOT NULL, address TEXT NOT NULL, value TEXT NOT NULL, '
+                'PRIMARY KEY (scope, address))'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS migrations (file TEXT PRIMARY KEY)'
+            )
+        return self._connection
+
+    def _load_scope(self, scope: str) -> dict[str, object]:
+        if scope not in self._cache:
+            self._migrate_json(scope)
+            rows = self.connection.execute(
+                'SELECT address, value FROM progress WHERE scope = ?', (scope,)
+            ).fetchall()
+            self._cache[scope] = {address: json.loads(value) for address, value in rows}
+        return self._cache[scope]
+
+    def _migrate_json(self, scope: str):
+        file = f'data/{scope}.json'
+        if not os.path.exists(file):
+            return
+
+        if self.connection.execute('SELECT 1 FROM migrations WHERE file = ?', (file,)).fetchone():
+            return
+
+        try:
+            with open(file, 'r') as f:
+                progress = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"File read error {file}: {e}")
+            return
+
+        if not isinstance(progress, dict):
+            logger.error(f"Incorrect data format in {file}. Expected dictionary.")
+            return
+
+        # other processes may share the database, so the check is repeated under the write lock
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self.connection.execute('SELECT 1 FROM migrations WHERE file = ?', (file,)).fetchone():
+                return
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO progress (scope, address, value) VALUES (?, ?, ?)',
+                [(scope, address, json.dumps(value)) for address, value in progress.items()]
+            )
+            self.connection.execute('INSERT INTO migrations (file) VALUES (?)', (file,))
+
+        logger.info(f'Progress from {file} moved to {self.path}: {len(progress)} accounts')
+
+    def get(self, scope: str, address: str, default=None):
+        value = self._load_scope(scope).get(address, default)
+        return copy.deepcopy(value)
+
+    def keys(self, scope: str) -> list[str]:
+        return list(self._load_scope(scope))
+
+    def contains(self, scope: str, address: str) -> bool:
+        return address in self._load_scope(scope)
+
+    def set(self, scope: str, address: str, value):
+        data = self._load_scope(scope)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO progress (scope, address, value) VALUES (?, ?, ?)',
+            (scope, address, json.dumps(value))
+        )
+        data[address] = copy.deepcopy(value)
+
+    def delete(self, scope: str, address: str):
+        data = self._load_scope(scope)
+        self.connection.execute('DELETE FROM progress WHERE scope = ? AND address = ?', (scope, address))
+        data.pop(address, None)
+
+    def update(self, scope: str, address: str, **fields):
+        value = self.get(scope, address)
+        if not isinstance(value, dict):
+            value = {}
+        value.update(fields)
+        self.set(scope, address, value)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._cache.clear()
+
+
+progress_store = ProgressStore()
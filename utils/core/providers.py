@@ -0,0 +1,363 @@
+import asyncio
+import itertools
+import json
+import time
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, WSMsgType
+from eth_utils import keccak
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.async_base import AsyncBaseProvider
+
+from .cache import read_caches
+from .endpoints import EndpointPool, endpoint_pools
+from .logger import logger
+from generall_settings import (
+    RPC_CONNECTIONS_LIMIT, RPC_CONNECTIONS_PER_HOST, RPC_KEEPALIVE_TIMEOUT, RPC_TIMEOUT, RPC_FAILOVER_ATTEMPTS,
+    RPC_EJECT_TIME, RPC_WS_HEARTBEAT
+)
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    def __init__(self, endpoint_uri: str, proxy: None | str = None, **kwargs):
+        request_kwargs = {"proxy": proxy} if proxy else {}
+        # failover between endpoints is done by RoutingProvider, not by retrying the same one
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs, exception_retry_configuration=None, **kwargs)
+        self._session: ClientSession | None = None
+        self._session_lock = asyncio.Lock()
+
+    async def _ensure_session(self):
+        if self._session is not None and not self._session.closed:
+            return
+
+        async with self._session_lock:
+            if self._session is not None and not self._session.closed:
+                return
+
+            connector = TCPConnector(
+                limit=RPC_CONNECTIONS_LIMIT,
+                limit_per_host=RPC_CONNECTIONS_PER_HOST,
+                keepalive_timeout=RPC_KEEPALIVE_TIMEOUT,
+                ssl=False
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=RPC_TIMEOUT),
+                raise_for_status=True
+            )
+            await self.cache_async_session(self._session)
+
+    async def make_request(self, method, params):
+        await self._ensure_session()
+        return await super().make_request(method, params)
+
+    async def make_batch_request(self, batch_requests):
+        await self._ensure_session()
+        return await super().make_batch_request(batch_requests)
+
+    async def disconnect(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class WebSocketProvider:
+    def __init__(self, endpoint_uri: str, proxy: None | str = None):
+        self.endpoint_uri = endpoint_uri
+        self.proxy = proxy
+        self._session: ClientSession | None = None
+        self._ws = None
+        self._reader: asyncio.Task | None = None
+        self._closed = False
+        self._connect_lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._idle_task: asyncio.Task | None = None
+        self._used_at = time.monotonic()
+        self._request_ids = itertools.count(1)
+        self._pending: dict[int, tuple[object, asyncio.Future]] = {}
+        # subscriptions are kept by a local id, the node gives them a new one after every reconnect
+        self._subscription_ids = itertools.count(1)
+        self._subscriptions: dict[int, tuple[list, object]] = {}
+        self._node_subscriptions: dict[str, int] = {}
+
+    def __str__(self) -> str:
+        return f'WebSocket {self.endpoint_uri}'
+
+    @property
+    def is_connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def _ensure_connection(self):
+        if self.is_connected:
+            return
+
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+
+            if self._session is None or self._session.closed:
+                self._session = ClientSession(connector=TCPConnector(ssl=False))
+
+            self._ws = await asyncio.wait_for(
+                self._session.ws_connect(
+                    self.endpoint_uri, proxy=self.proxy, heartbeat=RPC_WS_HEARTBEAT, max_msg_size=0
+                ),
+                RPC_TIMEOUT
+            )
+            self._closed = False
+            self._used_at = time.monotonic()
+            self._reader = asyncio.create_task(self._read(self._ws))
+            if self._idle_task is None or self._idle_task.done():
+                self._idle_task = asyncio.create_task(self._close_when_idle())
+
+            self._node_subscriptions.clear()
+            for subscription_id, (params, _) in list(self._subscriptions.items()):
+                try:
+                    await self._subscribe(subscription_id, params)
+                except Exception as error:
+                    logger.warning(f'{self} | Failed to restore a subscription to {params[0]}: {error}')
+
+    async def _read(self, ws):
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                for item in data if isinstance(data, list) else [data]:
+                    self._dispatch(item)
+        except Exception as error:
+            logger.warning(f'{self} | Connection lost: {error}')
+        finally:
+            # without a reader the connection would look alive while nothing is answered
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+            for request_id, (request_ws, future) in list(self._pending.items()):
+                if request_ws is ws and not future.done():
+                    future.set_exception(ConnectionError(f'{self} closed'))
+
+            if self._subscriptions and not self._closed and self._ws is ws:
+                if self._reconnect_task is None or self._reconnect_task.done():
+                    self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    def _dispatch(self, item: dict):
+        if item.get('method') == 'eth_subscription':
+            params = item.get('params', {})
+            subscription_id = self._node_subscriptions.get(params.get('subscription'))
+            if subscription_id in self._subscriptions:
+                try:
+                    self._subscriptions[subscription_id][1](params.get('result'))
+                except Exception as error:
+                    logger.warning(f'{self} | Subscription handler error: {error}')
+            return
+
+        pending = self._pending.pop(item.get('id'), None)
+        if pending is not None and not pending[1].done():
+            pending[1].set_result(item)
+
+    async def _close_when_idle(self):
+        # connections are opened per proxy, one that only served requests is not kept for the whole run
+        while self.is_connected:
+            idle_time = time.monotonic() - self._used_at
+            if not self._subscriptions and not self._pending and idle_time >= RPC_KEEPALIVE_TIMEOUT:
+                ws, session = self._ws, self._session
+                self._ws, self._session, self._idle_task = None, None, None
+                await ws.close()
+                await session.close()
+                return
+            await asyncio.sleep(max(RPC_KEEPALIVE_TIMEOUT - idle_time, 1))
+
+    async def _reconnect(self):
+        delay = 1
+        while self._subscriptions and not self._closed:
+            try:
+                await self._ensure_connection()
+                return
+            except Exception as error:
+                logger.warning(f'{self} | Reconnect failed, next try in {delay} seconds: {error}')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RPC_EJECT_TIME)
+
+    async def _send(self, requests: list[tuple[str, list]], batch: bool) -> list[dict]:
+        await self._ensure_connection()
+        ws = self._ws
+        loop = asyncio.get_running_loop()
+        self._used_at = time.monotonic()
+
+        request_ids, futures, payload = [], [], []
+        for method, params in requests:
+            request_id = next(self._request_ids)
+            future = loop.create_future()
+            self._pending[request_id] = (ws, future)
+            request_ids.append(request_id)
+            futures.append(future)
+            payload.append({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+
+        try:
+            await ws.send_str(json.dumps(payload if batch else payload[0], cls=Web3JsonEncoder))
+            return await asyncio.wait_for(asyncio.gather(*futures), RPC_TIMEOUT)
+        finally:
+            for request_id in request_ids:
+                self._pending.pop(request_id, None)
+
+    async def make_request(self, method, params):
+        responses = await self._send([(method, params)], batch=False)
+        return responses[0]
+
+    async def make_batch_request(self, batch_requests):
+        return await self._send(list(batch_requests), batch=True)
+
+    async def _subscribe(self, subscription_id: int, params: list):
+        response = await self.make_request('eth_subscribe', params)
+        if 'result' not in response:
+            raise ConnectionError(response.get('error', response))
+        self._node_subscriptions[response['result']] = subscription_id
+
+    async def subscribe(self, params: list, callback) -> int:
+        subscription_id = next(self._subscription_ids)
+        self._subscriptions[subscription_id] = (params, callback)
+        try:
+            await self._subscribe(subscription_id, params)
+        except Exception:
+            self._subscriptions.pop(subscription_id)
+            raise
+        return subscription_id
+
+    async def unsubscribe(self, subscription_id: int):
+        self._subscriptions.pop(subscription_id, None)
+        for node_subscription, local_id in list(self._node_subscriptions.items()):
+            if local_id == subscription_id:
+                self._node_subscriptions.pop(node_subscription)
+                if self.is_connected:
+                    await self.make_request('eth_unsubscribe', [node_subscription])
+
+    async def disconnect(self):
+        self._closed = True
+        self._subscriptions.clear()
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._ws = None
+        self._session = None
+
+
+class RoutingProvider(AsyncBaseProvider):
+    def __init__(self, registry: 'ProviderRegistry', pool: EndpointPool, proxy: None | str = None):
+        super().__init__()
+        self.registry = registry
+        self.pool = pool
+        self.proxy = proxy
+
+    def __str__(self) -> str:
+        return f'RPC pool {self.pool.network.name}'
+
+    async def _route(self, method: str, send):
+        endpoints = self.pool.ranked()[:RPC_FAILOVER_ATTEMPTS]
+        if not endpoints:
+            raise ConnectionError(f'No supported RPC endpoints for {self.pool.network.name}')
+
+        for attempt, endpoint in enumerate(endpoints):
+            provider = self.registry.get_provider(endpoint.url, self.proxy)
+            started_at = time.monotonic()
+            try:
+                response = await send(provider)
+            except Exception as error:
+                self.pool.record_failure(endpoint)
+                if attempt == len(endpoints) - 1:
+                    raise
+                logger.warning(f'RPC {endpoint.url} failed on {method}, switching endpoint: {error}')
+                continue
+
+            self.pool.record_success(endpoint, time.monotonic() - started_at)
+            return response, attempt
+
+    async def make_request(self, method, params):
+        return await read_caches.get(self.pool.network).request(
+            method, params, lambda: self._make_request(method, params)
+        )
+
+    async def _make_request(self, method, params):
+        response, attempt = await self._route(method, lambda provider: provider.make_request(method, params))
+
+        # a retried broadcast may have reached the previous endpoint before it failed
+        error = response.get('error') if isinstance(response, dict) else None
+        if method == 'eth_sendRawTransaction' and attempt and error and 'already known' in str(error).lower():
+            raw_transaction = bytes.fromhex(params[0][2:] if isinstance(params[0], str) else params[0].hex())
+            return {'jsonrpc': '2.0', 'id': response.get('id'), 'result': '0x' + keccak(raw_transaction).hex()}
+
+        return response
+
+    async def make_batch_request(self, batch_requests):
+        return await read_caches.get(self.pool.network).batch_request(list(batch_requests), self._make_batch_request)
+
+    async def _make_batch_request(self, batch_requests):
+        response, _ = await self._route('batch', lambda provider: provider.make_batch_request(batch_requests))
+        return response
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = await self.make_request('eth_chainId', [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return 'result' in response
+
+    async def disconnect(self):
+        pass
+
+
+class ProviderRegistry:
+    def __init__(self):
+        self._providers: dict[tuple[str, str | None], PooledHTTPProvider | WebSocketProvider] = {}
+        self._instances: dict[tuple[int, str | None], AsyncWeb3] = {}
+
+    def get_provider(self, rpc: str, proxy: None | str = None) -> PooledHTTPProvider | WebSocketProvider:
+        key = (rpc, proxy or None)
+        if key not in self._providers:
+            if rpc.startswith(('ws://', 'wss://')):
+                self._providers[key] = WebSocketProvider(rpc, proxy=proxy or None)
+            else:
+                self._providers[key] = PooledHTTPProvider(rpc, proxy=proxy)
+        return self._providers[key]
+
+    def get_w3(self, network, proxy: None | str = None) -> AsyncWeb3:
+        key = (network.chain_id, proxy or None)
+        if key not in self._instances:
+            self._instances[key] = AsyncWeb3(RoutingProvider(self, endpoint_pools.get(network), proxy))
+        return self._instances[key]
+
+    async def subscribe(self, network, params: list, callback, proxy: None | str = None):
+        pool = endpoint_pools.get(network)
+        for endpoint in pool.ranked():
+            if not endpoint.url.startswith(('ws://', 'wss://')):
+                continue
+
+            provider = self.get_provider(endpoint.url, proxy)
+            try:
+                return provider, await provider.subscribe(params, callback)
+            except Exception as error:
+                pool.record_failure(endpoint)
+                logger.warning(f'{provider} | Subscription to {params[0]} failed: {error}')
+        return None
+
+    async def close(self):
+        rpc_providers = list(self._providers.values())
+        self._providers.clear()
+        self._instances.clear()
+
+        for provider in rpc_providers:
+            try:
+                await provider.disconnect()
+            except Exception:
+                pass
+
+
+providers = ProviderRegistry()
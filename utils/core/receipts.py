@@ -0,0 +1,153 @@
+import asyncio
+
+from .cache import read_caches
+from .fees import fee_oracles
+from .logger import logger
+from .providers import providers
+from generall_settings import RECEIPT_POLL_INTERVAL, RECEIPT_MAX_BLOCK_RANGE
+
+
+class ReceiptWatcher:
+    def __init__(self, network):
+        self.network = network
+        self.block_number: int | None = None
+        self.block_receipts_supported = True
+        self._pending: dict[str, asyncio.Future] = {}
+        self._unchecked: set[str] = set()
+        self._client = None
+        self._task: asyncio.Task | None = None
+        self._head = asyncio.Event()
+        self._subscription = None
+        self._subscription_tried = False
+
+    async def wait_for_receipt(self, client, tx_hash: str, timeout: int) -> dict:
+        tx_hash = tx_hash.lower()
+        future = self._pending.get(tx_hash)
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._pending[tx_hash] = future
+            self._unchecked.add(tx_hash)
+
+        self._client = client
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        finally:
+            if self._pending.get(tx_hash) is future:
+                self._pending.pop(tx_hash)
+
+    def _on_head(self, head: dict):
+        self._head.set()
+
+    async def _wait_for_head(self):
+        if self._subscription is None:
+            await asyncio.sleep(RECEIPT_POLL_INTERVAL)
+            return
+
+        # heads are pushed over the WebSocket, if none comes within the poll interval the watcher polls anyway
+        try:
+            await asyncio.wait_for(self._head.wait(), RECEIPT_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        self._head.clear()
+
+    async def _watch(self):
+        if not self._subscription_tried:
+            self._subscription_tried = True
+            self._subscription = await providers.subscribe(
+                self.network, ['newHeads'], self._on_head, self._client.proxy_init
+            )
+
+        while self._pending:
+            try:
+                # a new tx may land in a block the watcher has already passed, so look it up directly once
+                unchecked = list(self._unchecked)
+                results = await self._client.batch_request(
+                    [('eth_blockNumber', [])] + [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in unchecked]
+                )
+                self._unchecked.difference_update(unchecked)
+                for receipt in results[1:]:
+                    if isinstance(receipt, dict):
+                        self._set_receipt(receipt)
+
+                block_number = int(results[0], 16)
+
+                if self.block_number is None or block_number > self.block_number:
+                    fee_oracles.get(self.network).on_new_block(block_number)
+                    read_caches.get(self.network).on_new_block(block_number)
+
+                    first_block = block_number if self.block_number is None else self.block_number + 1
+                    await self._resolve(first_block, block_number)
+                    self.block_number = block_number
+            except Exception as error:
+                logger.warning(f'{self.network.name} | Receipt watcher error: {self._client.get_normalize_error(error)}')
+
+            await self._wait_for_head()
+
+    async def _resolve(self, first_block: int, last_block: int):
+        if self.block_receipts_supported and last_block - first_block < RECEIPT_MAX_BLOCK_RANGE:
+            requests = [('eth_getBlockReceipts', [hex(number)]) for number in range(first_block, last_block + 1)]
+            results = await self._client.batch_request(requests)
+
+            if not any(isinstance(result, Exception) for result in results):
+                for block_receipts in results:
+                    for receipt in block_receipts or []:
+                        self._set_receipt(receipt)
+                return
+
+            self.block_receipts_supported = False
+
+        hashes = list(self._pending)
+        results = await self._client.batch_request(
+            [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes]
+        )
+        for receipt in results:
+            if isinstance(receipt, dict):
+                self._set_receipt(receipt)
+
+    def _set_receipt(self, receipt: dict):
+        future = self._pending.get(receipt['transactionHash'].lower())
+        if future is not None and not future.done():
+            future.set_result(receipt)
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+        if self._subscription is not None:
+            provider, subscription_id = self._subscription
+            try:
+                await provider.unsubscribe(subscription_id)
+            except Exception:
+                pass
+        self._subscription = None
+        self._subscription_tried = False
+        self._pending.clear()
+        self._unchecked.clear()
+
+
+class ReceiptWatchers:
+    def __init__(self):
+        self._watchers: dict[int, ReceiptWatcher] = {}
+
+    def get(self, network) -> ReceiptWatcher:
+        if network.chain_id not in self._watchers:
+            self._watchers[network.chain_id] = ReceiptWatcher(network)
+        return self._watchers[network.chain_id]
+
+    async def close(self):
+        watchers = list(self._watchers.values())
+        self._watchers.clear()
+
+        for watcher in watchers:
+            await watcher.close()
+
+
+receipt_watchers = ReceiptWatchers()
@@ -0,0 +1,176 @@
+import asyncio
+import random
+import time
+
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+from .logger import logger
+from .sharding import shard_limit
+from generall_settings import (
+    SLEEP_MODE, SLEEP_TIME_ACCOUNTS, ACCOUNTS_PER_PROXY_HOST, TASKS_IN_NETWORK, SCHEDULER_REPORT_INTERVAL, STAGE_LIMITS
+)
+
+
+def get_proxy_host(proxy: None | str) -> str | None:
+    if not proxy:
+        return None
+    if '://' in proxy:
+        return urlparse(proxy).hostname
+    # host:port:login:password or login:password@host:port
+    return proxy.rsplit('@', 1)[-1].split(':')[0]
+
+
+held_limits: ContextVar[tuple] = ContextVar('held_limits', default=())
+
+
+@asynccontextmanager
+async def hold_limits(*semaphores: asyncio.Semaphore):
+    frame = []
+    token = held_limits.set(held_limits.get() + (frame,))
+    try:
+        for semaphore in semaphores:
+            await semaphore.acquire()
+            frame.append(semaphore)
+        yield
+    finally:
+        for semaphore in reversed(frame):
+            semaphore.release()
+        held_limits.reset(token)
+
+
+@asynccontextmanager
+async def released_limits():
+    # a task waiting for a block gives its slots to other tasks and takes them back in the same order
+    frames = [(frame, list(frame)) for frame in held_limits.get()]
+    for frame, semaphores in reversed(frames):
+        for semaphore in reversed(semaphores):
+            semaphore.release()
+        frame.clear()
+    try:
+        yield
+    finally:
+        for frame, semaphores in frames:
+            for semaphore in semaphores:
+                await semaphore.acquire()
+                frame.append(semaphore)
+
+
+class NetworkLimits:
+    def __init__(self):
+        self._semaphores: dict[int, asyncio.Semaphore] = {}
+
+    def get(self, network) -> asyncio.Semaphore:
+        if network.chain_id not in self._semaphores:
+            self._semaphores[network.chain_id] = asyncio.Semaphore(shard_limit(TASKS_IN_NETWORK))
+        return self._semaphores[network.chain_id]
+
+    def clear(self):
+        self._semaphores.clear()
+
+
+class StageLimits:
+    def __init__(self):
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def get(self, stage: str) -> asyncio.Semaphore:
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(shard_limit(STAGE_LIMITS.get(stage, TASKS_IN_NETWORK)))
+        return self._semaphores[stage]
+
+    def clear(self):
+        self._semaphores.clear()
+
+
+class AccountScheduler:
+    def __init__(self, slots: int, handler, host_key=None):
+        self.slots = max(slots, 1)
+        self.handler = handler
+        self.host_key = host_key
+        self.done = 0
+        self.failed = 0
+        self._running = 0
+        self._started_at = 0.0
+        self._stop = asyncio.Event()
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, item) -> asyncio.Semaphore | None:
+        if ACCOUNTS_PER_PROXY_HOST is None:
+            return None
+
+        host = self.host_key(item) if self.host_key else None
+        if host is None:
+            return None
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(ACCOUNTS_PER_PROXY_HOST)
+        return self._host_limits[host]
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not self._stop.is_set():
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            host_limit = self._host_limit(item)
+            if SLEEP_MODE and self.done + self.failed + self._running > 0:
+                duration = random.randint(*SLEEP_TIME_ACCOUNTS)
+                logger.info(f"💤 The next account will start in {duration:.2f} seconds")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), duration)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+
+            # the slot waits for its proxy host instead of taking another account
+            async with host_limit if host_limit is not None else nullcontext():
+                if self._stop.is_set():
+                    return
+
+                self._running += 1
+                try:
+                    await self.handler(item)
+                    self.done += 1
+                except Exception as error:
+                    self.failed += 1
+                    logger.error(f"Account task failed: {error}")
+                finally:
+                    self._running -= 1
+
+    async def _report(self, queue: asyncio.Queue):
+        while True:
+            await asyncio.sleep(SCHEDULER_REPORT_INTERVAL)
+            elapsed = max(time.monotonic() - self._started_at, 1)
+            logger.info(
+                f"Queue: {queue.qsize()} waiting | {self._running} running | "
+                f"{self.done} done | {self.failed} failed | {self.done / elapsed * 60:.2f} accounts/min"
+            )
+
+    async def run(self, items: list):
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        self._started_at = time.monotonic()
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.slots, len(items)))]
+        reporter = asyncio.create_task(self._report(queue))
+
+        gathering = asyncio.gather(*workers)
+
+        try:
+            await asyncio.shield(gathering)
+        except asyncio.CancelledError:
+            self._stop.set()
+            logger.warning(f"Stopping: waiting for {self._running} running accounts to finish, {queue.qsize()} not started")
+            await gathering
+            raise
+        finally:
+            reporter.cancel()
+
+        elapsed = max(time.monotonic() - self._started_at, 1)
+        logger.info(f"All accounts processed: {self.done} done | {self.failed} failed | {elapsed:.0f} seconds")
+
+
+network_limits = NetworkLimits()
+stage_limits = StageLimits()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from curl_cffi.requests import AsyncSession
+
+from .logger import logger
+from .sharding import shard_limit, shard_rate
+from generall_settings import (
+    HTTP_CONNECTIONS_LIMIT, HTTP_CONNECTIONS_PER_HOST, HTTP_REQUESTS_PER_SECOND, HTTP_MAX_REQUESTS_PER_SECOND,
+    HTTP_RETRY_ATTEMPTS
+)
+
+MIN_REQUESTS_PER_SECOND = 0.2
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # requests wait their turn here instead of failing when the budget is spent
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        # additive increase: about one more request per second for every second at full rate
+        self.rate = min(self.rate + 1 / self.rate, shard_rate(HTTP_MAX_REQUESTS_PER_SECOND))
+
+    def on_throttle(self, retry_after: float | None):
+        # multiplicative decrease
+        self.rate = max(self.rate / 2, shard_rate(MIN_REQUESTS_PER_SECOND))
+        self.tokens = 0.0
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class SessionPool:
+    def __init__(self):
+        self._sessions: dict[str | None, AsyncSession] = {}
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._rate_limiters: dict[str, RateLimiter] = {}
+
+    @staticmethod
+    def get_retry_after(response) -> float | None:
+        value = response.headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def get_session(self, proxy: None | str = None) -> AsyncSession:
+        key = proxy or None
+        if key not in self._sessions:
+            # connections are shared by accounts behind the same proxy, cookies are not
+            self._sessions[key] = AsyncSession(max_clients=shard_limit(HTTP_CONNECTIONS_LIMIT), discard_cookies=True)
+        return self._sessions[key]
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(shard_limit(HTTP_CONNECTIONS_PER_HOST))
+        return self._host_limits[host]
+
+    def get_rate_limiter(self, host: str) -> RateLimiter:
+        if host not in self._rate_limiters:
+            self._rate_limiters[host] = RateLimiter(shard_rate(HTTP_REQUESTS_PER_SECOND))
+        return self._rate_limiters[host]
+
+    async def request(self, method: str, url: str, proxy: None | str = None, **kwargs):
+        host = urlparse(url).hostname
+        rate_limiter = self.get_rate_limiter(host)
+
+        for attempt in range(HTTP_RETRY_ATTEMPTS + 1):
+            await rate_limiter.acquire()
+            async with self._host_limit(host):
+                response = await self.get_session(proxy).request(method, url, proxy=proxy, **kwargs)
+
+            if response.status_code != 429 and response.status_code < 500:
+                rate_limiter.on_success()
+                return response
+
+            rate_limiter.on_throttle(self.get_retry_after(response))
+            # a 5xx answer to a POST does not prove it was not handled, a retry could post a message twice
+            if response.status_code != 429 and method.upper() not in IDEMPOTENT_METHODS:
+                return response
+            if attempt < HTTP_RETRY_ATTEMPTS:
+                logger.warning(
+                    f'{host} answered {response.status_code}, the request is retried '
+                    f'at {rate_limiter.rate:.2f} requests per second'
+                )
+
+        return response
+
+    async def get(self, url: str, proxy: None | str = None, **kwargs):
+        return await self.request('GET', url, proxy=proxy, **kwargs)
+
+    async def post(self, url: str, proxy: None | str = None, **kwargs):
+        return await self.request('POST', url, proxy=proxy, **kwargs)
+
+    async def close(self):
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self._host_limits.clear()
+        self._rate_limiters.clear()
+
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception:
+                pass
+
+
+http_sessions = SessionPool()
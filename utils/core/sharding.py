@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+import sys
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .logger import logger
+
+
+shard_count = 1
+
+
+def set_shard_count(count: int):
+    global shard_count
+    shard_count = max(count, 1)
+
+
+def shard_limit(limit: int) -> int:
+    # every process gets its part of a limit that is set for the whole run
+    return max(limit // shard_count, 1)
+
+
+def shard_rate(rate: float) -> float:
+    return rate / shard_count
+
+
+def split_shards(items: list, count: int, key=None) -> list[list]:
+    groups: dict = {}
+    for index, item in enumerate(items):
+        group = key(item) if key else None
+        groups.setdefault(index if group is None else group, []).append(item)
+
+    # items with the same key stay in one shard
+    shards = [[] for _ in range(count)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [shard for shard in shards if shard]
+
+
+def init_shard_process(log_queue):
+    # records are formatted and written once, by the parent process
+    logger.remove()
+    logger.add(
+        lambda message: log_queue.put((message.record['level'].name, message.record['message'])),
+        format='{message}',
+        level='DEBUG'
+    )
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+def pump_logs(log_queue):
+    while True:
+        record = log_queue.get()
+        if record is None:
+            return
+        level, message = record
+        logger.log(level, message)
+
+
+async def run_sharded(target, shards: list[tuple]) -> list:
+    context = multiprocessing.get_context('spawn')
+    log_queue = context.Queue()
+    pump = threading.Thread(target=pump_logs, args=(log_queue,), daemon=True)
+    pump.start()
+
+    loop = asyncio.get_running_loop()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=len(shards),
+            mp_context=context,
+            initializer=init_shard_process,
+            initargs=(log_queue,)
+        ) as executor:
+            return await asyncio.gather(
+                *(loop.run_in_executor(executor, target, *shard) for shard in shards),
+                return_exceptions=True
+            )
+    finally:
+        log_queue.put(None)
+        pump.join()
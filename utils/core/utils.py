@@ -1,8 +1,15 @@
 import asyncio
+import csv
+import hashlib
+import os
 import random
 import openpyxl
 
+from typing import Iterator
+
+from .accounts import Account
 from .logger import logger
+from generall_settings import ACCOUNTS_FILE
 
 
 async def smart_sleep(up, to):
@@ -10,25 +17,25 @@ async def smart_sleep(up, to):
     logger.info(f"💤 Waiting {duration:.2f} seconds.")
     await asyncio.sleep(duration)
 
-def get_accounts_data():
+def iter_rows(path: str) -> Iterator[tuple]:
+    if path.endswith(('.csv', '.tsv')):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f, delimiter='\t' if path.endswith('.tsv') else ',')
+            next(reader, None)
+            yield from reader
+        return
+
+    book = openpyxl.load_workbook(path, read_only=True)
     try:
-        book = openpyxl.load_workbook('data/accounts.xlsx', read_only=True)
-        sheet = book.active
-    except FileNotFoundError:
-        logger.error('The file accounts.xlsx was not found')
-        return [], [], [], []
-    except Exception as e:
-        logger.error(f"Error when opening a file: {e}")
-        return [], [], [], []
+        yield from book.active.iter_rows(min_row=2, max_col=4, values_only=True)
+    finally:
+        book.close()
 
-    accounts = []
-    
-    for row in range(2, sheet.max_row + 1):
+
+def iter_accounts(path: str = ACCOUNTS_FILE) -> Iterator[Account]:
+    for row, values in enumerate(iter_rows(path), start=2):
         try:
-            account_name = sheet.cell(row=row, column=1).value
-            private_key = sheet.cell(row=row, column=2).value
-            proxies = sheet.cell(row=row, column=3).value
-            ds_auth_token = sheet.cell(row=row, column=4).value
+            account_name, private_key, proxies, ds_auth_token = (list(values) + [None] * 4)[:4]
 
             if not any([account_name, private_key, proxies, ds_auth_token]):
                 continue
@@ -37,15 +44,47 @@ def get_accounts_data():
                 logger.warning(f"String {row}: Insufficient data for account")
                 continue
 
-            account = {
-                'account_name': account_name,
-                'private_key': private_key,
-                'proxies': proxies,
-                'ds_auth_token': ds_auth_token or ''
-            }
-            accounts.append(account)
+            yield Account(
+                name=account_name,
+                private_key=private_key,
+                proxy=proxies,
+                ds_auth_token=ds_auth_token or ''
+            )
 
         except Exception as e:
             logger.error(f"Error when reading a string {row}: {e}")
 
-    return accounts
+
+def get_file_hash(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+_accounts_cache: dict[str, tuple[float, int, str, list]] = {}
+
+
+def get_accounts_data(path: str = ACCOUNTS_FILE) -> list[Account]:
+    try:
+        stat = os.stat(path)
+        cached = _accounts_cache.get(path)
+        if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+            return list(cached[3])
+
+        file_hash = get_file_hash(path)
+        if cached and cached[2] == file_hash:
+            _accounts_cache[path] = (stat.st_mtime, stat.st_size, file_hash, cached[3])
+            return list(cached[3])
+
+        accounts = list(iter_accounts(path))
+    except FileNotFoundError:
+        logger.error(f'The file {path} was not found')
+        return []
+    except Exception as e:
+        logger.error(f"Error when opening a file: {e}")
+        return []
+
+    _accounts_cache[path] = (stat.st_mtime, stat.st_size, file_hash, accounts)
+    return list(accounts)
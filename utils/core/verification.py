@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from .explorer import ExplorerException, explorers
+from .logger import logger
+from .sharding import shard_limit
+from .sessions import http_sessions
+from generall_settings import VERIFICATION_CONCURRENCY, VERIFICATION_POLL_INTERVAL, VERIFICATION_TIMEOUT
+
+
+class VerificationQueue:
+    def __init__(self, network):
+        self.network = network
+        self.explorer = explorers.get(network)
+        self._semaphore = asyncio.Semaphore(shard_limit(VERIFICATION_CONCURRENCY))
+        self._pending: dict[str, asyncio.Future] = {}
+
+    async def check(self, addresses: list[str], proxy: None | str = None) -> dict[str, bool]:
+        results = await asyncio.gather(
+            *(self.explorer.is_verified(address, proxy) for address in addresses), return_exceptions=True
+        )
+
+        statuses = {}
+        for address, result in zip(addresses, results):
+            if isinstance(result, Exception):
+                logger.warning(f'{self.network.name} | Failed to check verification of {address}: {result}')
+            else:
+                statuses[address] = result
+        return statuses
+
+    async def verify(self, address: str, payload: dict, headers: dict, proxy: None | str = None) -> bool:
+        # the same contract is submitted once even if several tasks ask for it
+        future = self._pending.get(address)
+        if future is None:
+            future = asyncio.ensure_future(self._verify(address, payload, headers, proxy))
+            self._pending[address] = future
+            future.add_done_callback(lambda _: self._pending.pop(address, None))
+        return await asyncio.shield(future)
+
+    async def _verify(self, address: str, payload: dict, headers: dict, proxy: None | str) -> bool:
+        async with self._semaphore:
+            response = await http_sessions.post(
+                url=f'{self.explorer.api_url}/smart-contracts/{address}/verification/via/flattened-code',
+                headers=headers, json=payload, proxy=proxy
+            )
+        if response.status_code != 200:
+            raise ExplorerException(f'Request error: {response.status_code}')
+
+        # a 200 only means the explorer accepted the source, compilation and matching happen afterwards
+        deadline = time.monotonic() + VERIFICATION_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(VERIFICATION_POLL_INTERVAL)
+            if await self.explorer.is_verified(address, proxy, cached=False):
+                return True
+        return False
+
+
+class VerificationQueues:
+    def __init__(self):
+        self._queues: dict[int, VerificationQueue] = {}
+
+    def get(self, network) -> VerificationQueue:
+        if network.chain_id not in self._queues:
+            self._queues[network.chain_id] = VerificationQueue(network)
+        return self._queues[network.chain_id]
+
+    def clear(self):
+        self._queues.clear()
+
+
+verification_queues = VerificationQueues()
@@ -1,17 +1,25 @@
 import re
+import weakref
 
 from web3 import AsyncWeb3
+from web3.contract import AsyncContract
 from faker import Faker
-from curl_cffi.requests import AsyncSession
 
 from utils.core import*
 from data.config import*
-from generall_settings import MIN_AVAILABLE_BALANCE
+from generall_settings import MIN_AVAILABLE_BALANCE, DOMAIN_CANDIDATES
 
 faker = Faker()
 
+ZNS_CONTRACT_ADDRESS = AsyncWeb3.to_checksum_address('0xf180136DdC9e4F8c9b5A9FE59e2b1f07265C5D4D')
+ZERO_ADDRESS = AsyncWeb3.to_checksum_address('0x0000000000000000000000000000000000000000')
+
 
 class Extra:
+    # shared by all accounts: one contract object per web3 instance, prices by name length
+    zns_contracts: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+    domain_prices: dict[int, int] = {}
+
     def __init__(self, client: Client):
         self.client: Client = client 
 
@@ -32,6 +40,53 @@ class Extra:
             return False
         return True
 
+    def get_zns_contract(self) -> AsyncContract:
+        if self.client.w3 not in self.zns_contracts:
+            self.zns_contracts[self.client.w3] = self.client.w3.eth.contract(
+                address=ZNS_CONTRACT_ADDRESS, abi=ZNS_CONNECT
+            )
+        return self.zns_contracts[self.client.w3]
+
+    async def get_domain_prices(self, contract: AsyncContract, lengths: set[int]) -> dict[int, int]:
+        missing = sorted(length for length in lengths if length not in self.domain_prices)
+        if missing:
+            results = await self.client.batch_request([
+                ('eth_call', [{
+                    'to': ZNS_CONTRACT_ADDRESS,
+                    'data': contract.encode_abi('priceToRegister', args=[length])
+                }, 'latest'])
+                for length in missing
+            ])
+            for length, result in zip(missing, results):
+                if isinstance(result, Exception):
+                    raise result
+                self.domain_prices[length] = self.client.w3.codec.decode(['uint256'], bytes.fromhex(result[2:]))[0]
+
+        return {length: self.domain_prices[length] for length in lengths}
+
+    async def find_free_domain(self, contract: AsyncContract, names: list[str], prices: dict[int, int]) -> str | None:
+        # the registration is simulated for every name at once, a taken name reverts with AlreadyRegistered()
+        results = await self.client.batch_request([
+            ('eth_call', [{
+                'from': self.client.address,
+                'to': ZNS_CONTRACT_ADDRESS,
+                'value': hex(prices[len(name)]),
+                'data': contract.encode_abi(
+                    'registerDomains',
+                    args=[[self.client.address], [name], [1], ZERO_ADDRESS, 0]
+                )
+            }, 'latest'])
+            for name in names
+        ])
+
+        for name, result in zip(names, results):
+            if not isinstance(result, Exception):
+                return name
+            if '0x3a81d6fc' not in str(result):
+                raise result
+            logger.warning(f"Domain {[name]} already registered, skipping...")
+        return None
+
     async def register_domen(self):
         logger.info(
             f'{self.client.name} | Domain Registration with Ink Sepolia'
@@ -42,43 +97,25 @@ class Extra:
         if not self.control_balance(balance=balance):
             return 
 
-        contract_address = AsyncWeb3.to_checksum_address(
-            '0xf180136DdC9e4F8c9b5A9FE59e2b1f07265C5D4D'
+        contract = self.get_zns_contract()
+        while True:
+            names = list(dict.fromkeys(
+                re.split(r'\.', faker.domain_name())[0] for _ in range(DOMAIN_CANDIDATES)
+            ))
+            prices = await self.get_domain_prices(contract, {len(name) for name in names})
+
+            name = await self.find_free_domain(contract, names, prices)
+            if name:
+                break
+
+        data = contract.encode_abi(
+            'registerDomains',
+            args=[[self.client.address], [name], [1], ZERO_ADDRESS, 0]
         )
-        contract = self.client.w3.eth.contract(
-            address=contract_address, abi=ZNS_CONNECT
+        transaction = await self.client.prepare_transaction(
+            value=prices[len(name)], to=ZNS_CONTRACT_ADDRESS, data=data
         )
-        while True:
-            domain_name = faker.domain_name()
-            name = re.split(r'\.', domain_name)[0]
-
-            owners = [self.client.address]
-            domain_names = [name]
-            expiries = [1]
-            referral = AsyncWeb3.to_checksum_address('0x0000000000000000000000000000000000000000')
-            credits = 0
-
-            length_of_domain = len(domain_names[0])
-
-            price = await contract.functions.priceToRegister(length_of_domain).call()
-
-            tx_params = await self.client.prepare_transaction(value=price)
-            transaction = await contract.functions.registerDomains(
-                owners,
-                domain_names,
-                expiries,
-                referral,
-                credits
-            ).build_transaction(tx_params)
-            try:
-                await self.client.send_transaction(tx_params, need_hash=True)
-            except Exception as e:
-                if '0x3a81d6fc' in str(e):
-                    logger.warning(f"Domain {domain_names} already registered, skipping...")
-                    continue
-                else:
-                    raise e
-            return
+        await self.client.send_transaction(transaction, need_hash=True)
 
     async def request_faucet_owlto(self):
         headers = {
@@ -89,28 +126,28 @@ class Extra:
 
         url = f'https://owlto.finance/faucet_api/v1/ink_faucet/{self.client.address}/claim'
 
-        async with AsyncSession() as session:
-            try:
-                response = await session.post(
-                    url=url, headers=headers, proxy=self.client.proxy_init
-                )
+        try:
+            response = await http_sessions.post(
+                url=url, headers=headers, proxy=self.client.proxy_init
+            )
 
-                result = response.json()
-                if result.get("code") == 0:
-                    tx_hash = result.get("data", {}).get("tx_hash")
-                    if tx_hash:
-                        logger.info(f"Tokens successfully requested. Transaction hash: {tx_hash}")
-                        return
-                    else:
-                        logger.error(f"{self.client.name} | Missing transaction hash in success response")
-                        return False
-                elif result.get("code") == 1006:
-                    return False
+            result = response.json()
+            if result.get("code") == 0:
+                tx_hash = result.get("data", {}).get("tx_hash")
+                if tx_hash:
+                    balances.invalidate(self.client.address)
+                    logger.info(f"Tokens successfully requested. Transaction hash: {tx_hash}")
+                    return
                 else:
-                    logger.error(f"{self.client.name} | Unknown response: {result}")
+                    logger.error(f"{self.client.name} | Missing transaction hash in success response")
                     return False
-
-            except Exception as e:
-                logger.error(f'{self.client.name} | Ink Sepolia token request error: {e}')
+            elif result.get("code") == 1006:
                 return False
+            else:
+                logger.error(f"{self.client.name} | Unknown response: {result}")
+                return False
+
+        except Exception as e:
+            logger.error(f'{self.client.name} | Ink Sepolia token request error: {e}')
+            return False
 
@@ -0,0 +1,21 @@
+from utils.core import *
+from utils.worker import Worker
+from utils.extra import Extra
+
+
+class AccountSession:
+    def __init__(self, account: Account):
+        self.account = account
+        self._modules: dict[int, tuple[Worker, Extra]] = {}
+
+    def get(self, network: Network) -> tuple[Worker, Extra]:
+        if network.chain_id not in self._modules:
+            client = Client(network=network, account=self.account)
+            self._modules[network.chain_id] = Worker(client=client), Extra(client=client)
+        return self._modules[network.chain_id]
+
+    def close(self):
+        # the account is finished, its nonces are not needed by anyone else
+        for chain_id in self._modules:
+            nonces.forget(chain_id, self.account.address)
+        self._modules.clear()
@@ -1,26 +1,25 @@
 import random
-import os
-import json
-import asyncio
 
 from datetime import datetime, timedelta
 from web3 import AsyncWeb3
 from eth_abi import encode
-from curl_cffi.requests import AsyncSession
 from typing import Union
 
 from utils.core import*
 from data.config import*
-from generall_settings import MIN_AVAILABLE_BALANCE, RANDOM_RANGE, ROUNDING_LEVELS
+from generall_settings import MIN_AVAILABLE_BALANCE, MIN_DEPLOY_BALANCE, RANDOM_RANGE, ROUNDING_LEVELS
 
 
 class Worker():
+    DEPLOY_ERC_721 = 'deploy_contract_erc_721'
+
     def __init__(self, client: Client):
         self.client: Client = client  
 
-        self.gm_check_time = 'data/gm_check_time.json'
-        self.feedback = 'data/feedback.json'
-        self.deploy_erc_721 = 'data/deploy_contract_erc_721.json'
+        self.gm_check_time = 'gm_check_time'
+        self.feedback = 'feedback'
+        self.deploy_erc_721 = self.DEPLOY_ERC_721
+        self.deployment: tuple[str, str] | None = None
 
         self.ds_headers = {
                     'authority': 'discord.com',
@@ -70,78 +69,87 @@ class Worker():
         return string
 
     async def searh_contract_address(self):
-        url = f'https://explorer-sepolia.inkonchain.com/api/v2/addresses/{self.client.address}/transactions?filter=to%3DNone'
-        async with AsyncSession() as session:
-            try:
-                response = await session.get(
-                    url=url, proxy=self.client.proxy_init
-                )
+        explorer = explorers.get(self.client.network)
+        try:
+            async for transaction in explorer.iter_items(
+                f'/addresses/{self.client.address}/transactions', {'filter': 'to=None'},
+                proxy=self.client.proxy_init,
+                reduce_item=lambda transaction: {
+                    'hash': transaction.get('hash'),
+                    'status': transaction.get('status'),
+                    'created_contract': (transaction.get('created_contract') or {}).get('hash')
+                }
+            ):
+                contract_hash = transaction['created_contract']
+                transaction_hash = transaction['hash']
 
-                if response.status_code != 200:
-                    logger.error(f'{self.client.name} |Request error: {response.status_code}')
-                    return False
-                
-                data = response.json()
-
-                if data.get('items'):
-                    for transaction in data['items']:
-                        if transaction.get('created_contract'):
-                            contract_hash = transaction['created_contract'].get('hash')
-                            transaction_hash = transaction.get('hash')
-                            
-                            if contract_hash and transaction_hash:
-                                return contract_hash, transaction_hash
-                    
-                    logger.warning(f'{self.client.name} | No transactions with contract creation')
-                else:
-                    logger.warning(f'{self.client.name} | No transactions at all')
-
-            except Exception as e:
-                logger.error(f'{self.client.name} |Request error of the contract address: {e}')
-                return False
+                if contract_hash and transaction_hash and transaction['status'] != 'error':
+                    return contract_hash, transaction_hash
 
-    def load_progress(self, file):
-        os.makedirs(os.path.dirname(file), exist_ok=True)
+            logger.warning(f'{self.client.name} | No transactions with contract creation')
 
-        if not os.path.exists(file):
-            with open(file, 'w') as f:
-                json.dump({}, f, indent=4)
-            return {}
+        except Exception as e:
+            logger.error(f'{self.client.name} |Request error of the contract address: {e}')
+            return False
 
-        try:
-            with open(file, 'r') as f:
-                progress = json.load(f)
-                if not isinstance(progress, dict):
-                    logger.error(f"Incorrect data format in {file}. Expected dictionary.")
-                    return {}
-                
-                for key, value in progress.items():
-                    if not isinstance(value, (dict, bool)):
-                        logger.error(f"Unexpected data type for key {key}: {type(value)}")
-                
-                return progress
-        except (json.JSONDecodeError, OSError) as e:
-            logger.error(f"File read error {file}: {e}")
-            return {}
+    async def get_contract_deployment(self) -> tuple[str | None, str | None]:
+        if self.deployment:
+            return self.deployment
 
+        deployment = progress_store.get(self.deploy_erc_721, self.client.address, {})
+        contract_address = deployment.get('contractAddress')
+        transaction_hash = deployment.get('deployTxHash')
+
+        if contract_address and transaction_hash:
+            self.deployment = contract_address, transaction_hash
+            return self.deployment
+
+        result = await self.searh_contract_address()
+        if not result:
+            return None, None
+
+        contract_address, transaction_hash = result
+        if progress_store.contains(self.deploy_erc_721, self.client.address):
+            progress_store.update(
+                self.deploy_erc_721, self.client.address,
+                contractAddress=contract_address, deployTxHash=transaction_hash
+            )
+
+        self.deployment = contract_address, transaction_hash
+        return self.deployment
+
+    @classmethod
+    async def prefetch_verifications(cls, network: Network, addresses: list[str]):
+        contracts = {}
+        for address in addresses:
+            deployment = progress_store.get(cls.DEPLOY_ERC_721, address, {})
+            contract_address = deployment.get('contractAddress')
+            if contract_address and not deployment.get('verificationContract', {}).get(contract_address):
+                contracts[contract_address] = address
+
+        if not contracts:
+            return
+
+        statuses = await verification_queues.get(network).check(list(contracts))
+        verified = [contract_address for contract_address, is_verified in statuses.items() if is_verified]
+        for contract_address in verified:
+            progress_store.update(
+                cls.DEPLOY_ERC_721, contracts[contract_address],
+                verificationContract={contract_address: True}
+            )
+
+        logger.info(f'Verification checked for {len(contracts)} contracts: {len(verified)} already verified')
+
+    def check_last_request(self, address, scope):
+        progress = progress_store.get(scope, address)
         
-    def check_last_request(self, address, file):
-        progress = self.load_progress(file)
-        
-        if address not in progress or 'timestamp' not in progress[address]:
+        if not progress or 'timestamp' not in progress:
             return False
         
-        last_time = datetime.fromisoformat(progress[address]['timestamp'])
+        last_time = datetime.fromisoformat(progress['timestamp'])
         time_since_last_gm = datetime.now() - last_time
         
         return time_since_last_gm < timedelta(hours=24)
-        
-    def save_progress(self, progress, file):
-        try:
-            with open(file, 'w') as f:
-                json.dump(progress, f, indent=4)
-        except (json.JSONDecodeError, OSError) as e:
-            logger.error(f"File saving error {file}: {e}")
 
     def control_balance(self, balance: int, min_available_balance = MIN_AVAILABLE_BALANCE) -> bool:
         if balance is None:
@@ -209,12 +217,7 @@ class Worker():
             '0x33f60714BbD74d62b66D79213C348614DE51901C'
         )
         
-        tx_params = await self.client.prepare_transaction(value=value)
-        transaction = {
-            **tx_params,
-            'to': contract_address,
-            'data': '0x'
-        }
+        transaction = await self.client.prepare_transaction(value=value, to=contract_address, data='0x')
         await self.client.send_transaction(transaction, need_hash=True)
 
     async def bridge_ink_to_sepolia(self):
@@ -223,9 +226,7 @@ class Worker():
 
     async def deploy_contract_erc_721(self):
 
-        progress = self.load_progress(file=self.deploy_erc_721)
-
-        if self.client.address in progress:
+        if progress_store.contains(self.deploy_erc_721, self.client.address):
             logger.warning(f"{self.client.name} | The rollout of the ERC-721 contract is skipped because it has already been done")
             return
 
@@ -235,55 +236,65 @@ class Worker():
 
         balance = await self.client.get_token_balance(check_native=True)
 
-        if not self.control_balance(balance=balance, min_available_balance=2000000000000000):
+        if not self.control_balance(balance=balance, min_available_balance=MIN_DEPLOY_BALANCE):
             return        
 
-        tx_params = await self.client.prepare_transaction()
-        transcation = {**tx_params, 'data': ERC_721_BYTE_CODE}
-        tx = await self.client.send_transaction(transcation)
+        transcation = await self.client.prepare_transaction(data=ERC_721_BYTE_CODE)
+        receipt = await self.client.send_transaction(transcation, need_receipt=True)
 
-        if not tx:
+        if not receipt:
             logger.error(f"{self.client.address} | Error when deploying an ERC-721 contract")
             return False
-        
-        await asyncio.sleep(5)
-        
-        contract_address, _ = await self.searh_contract_address()
-        
-        progress[self.client.address] = {
+
+        self.save_deployment(receipt, transcation['nonce'])
+
+    def save_deployment(self, receipt: dict, nonce: int):
+        if receipt.get('contractAddress'):
+            contract_address = AsyncWeb3.to_checksum_address(receipt['contractAddress'])
+        else:
+            contract_address = self.client.get_create_address(self.client.address, nonce)
+
+        progress_store.set(self.deploy_erc_721, self.client.address, {
+            "contractAddress": contract_address,
+            "deployTxHash": receipt['transactionHash'],
             "verificationContract": {
                 contract_address: False
             },
             "setGreeting": False
-        }
-        self.save_progress(progress, file=self.deploy_erc_721)
+        })
+        self.deployment = contract_address, receipt['transactionHash']
 
     async def verif_contract_erc_721(self):
-        progress = self.load_progress(file=self.deploy_erc_721)
-
-        if self.client.address not in progress:
+        if not progress_store.contains(self.deploy_erc_721, self.client.address):
             logger.warning(f"{self.client.name} | The ERC-721 contract has not yet been created, it is not possible to verify the contract")
             return
         
-        contract_address, _ = await self.searh_contract_address()
+        contract_address, _ = await self.get_contract_deployment()
         if not contract_address:
             return
         
         verification_contract = (
-            progress
-            .setdefault(self.client.address, {})
-            .setdefault("verificationContract", {})
+            progress_store.get(self.deploy_erc_721, self.client.address, {})
+            .get("verificationContract", {})
         ).get(contract_address, False)
 
         if verification_contract:
             logger.warning(f"{self.client.name} | The ERC-721 contract has already been verified")
             return
+
+        verification_queue = verification_queues.get(self.client.network)
+        statuses = await verification_queue.check([contract_address], proxy=self.client.proxy_init)
+        if statuses.get(contract_address):
+            logger.warning(f"{self.client.name} | The ERC-721 contract has already been verified")
+            progress_store.update(
+                self.deploy_erc_721, self.client.address,
+                verificationContract={contract_address: True}
+            )
+            return
         
         logger.info(
             f'{self.client.name} | Verification of ERC-721 contract in Ink Sepolia'
         )
-        
-        url = f'https://explorer-sepolia.inkonchain.com/api/v2/smart-contracts/{contract_address}/verification/via/flattened-code'
 
         headers = {
             'accept': '*/*',
@@ -305,35 +316,33 @@ class Worker():
             'license_type': 'mit',
         }
 
-        async with AsyncSession() as session:
-            try:
-                response = await session.post(
-                    url=url, headers=headers, json=json, proxy=self.client.proxy_init
-                )
+        try:
+            verified = await verification_queue.verify(
+                contract_address, payload=json, headers=headers, proxy=self.client.proxy_init
+            )
 
-                if response.status_code != 200:
-                    logger.error(f'{self.client.name} |Request error: {response.status_code}')
-                    return False
-                
-                logger.success(f'{self.client.name} | Successfully verified the contract. Contract address: {contract_address}')
+            if not verified:
+                logger.error(f'{self.client.name} | The explorer has not confirmed the verification. Contract address: {contract_address}')
+                return False
+            
+            logger.success(f'{self.client.name} | Successfully verified the contract. Contract address: {contract_address}')
 
-                progress[self.client.address]["verificationContract"][contract_address] = True
-                self.save_progress(progress, file=self.deploy_erc_721)
+            progress_store.update(
+                self.deploy_erc_721, self.client.address,
+                verificationContract={contract_address: True}
+            )
 
-            except Exception as e:
-                logger.error(f'{self.client.name} | Contract verification error: {e}')
-                return False
+        except Exception as e:
+            logger.error(f'{self.client.name} | Contract verification error: {e}')
+            return False
 
     async def set_greeting(self):
-        progress = self.load_progress(file=self.deploy_erc_721)
-
-        if self.client.address not in progress:
+        if not progress_store.contains(self.deploy_erc_721, self.client.address):
             logger.warning(f"{self.client.name} | The ERC-721 contract has not yet been created, it is not possible to change the salutation")
             return
 
         set_greeting_value = (
-            progress
-            .setdefault(self.client.address, {})
+            progress_store.get(self.deploy_erc_721, self.client.address, {})
             .get("setGreeting", False)
         )
         if set_greeting_value:
@@ -349,7 +358,7 @@ class Worker():
         if not self.control_balance(balance=balance):
             return 
 
-        contract_address, _ = await self.searh_contract_address()
+        contract_address, _ = await self.get_contract_deployment()
         if not contract_address:
             logger.error(f"{self.client.name} | Request error of the contract address")
             return
@@ -358,34 +367,30 @@ class Worker():
         encoded_parameters: bytes = encode(['string'], [greeting])
         data: bytes = bytes.fromhex("a4136862") + encoded_parameters
 
-        tx_params = await self.client.prepare_transaction()
-        transaction = {
-            **tx_params,
-            'to': contract_address,
-            'data': data
-        }
+        gas_profiles.register_code(self.client.network.chain_id, contract_address, ERC_721_BYTE_CODE)
+        transaction = await self.client.prepare_transaction(to=contract_address, data=data)
         tx = await self.client.send_transaction(transaction, need_hash=True)
 
         if not tx:
             logger.error(f"{self.client.address} | Error when changing the welcome message of the ERC-721 contract")
             return False
 
-        progress[self.client.address]["setGreeting"] = True
-        self.save_progress(progress, file=self.deploy_erc_721)
+        self.save_greeting()
         logger.success(f"{self.client.name} | The ERC-721 contract greeting has been successfully modified")
 
+    def save_greeting(self):
+        progress_store.update(self.deploy_erc_721, self.client.address, setGreeting=True)
+
     async def dicrod_feedback(self):
         if self.client.ds_auth_token in [None, '']:
             logger.warning(f'Skip {self.client.name}: missing DS-token')
             return
 
-        progress = self.load_progress(file=self.feedback)
-
-        contract_address, transaction_hash = await self.searh_contract_address()
+        contract_address, transaction_hash = await self.get_contract_deployment()
         if not contract_address:
             return
 
-        if self.client.address in progress and progress[self.client.address]:
+        if progress_store.get(self.feedback, self.client.address):
             logger.warning(f"{self.client.name} | Sending feedback is skipped because it has already been done")
             return
 
@@ -399,31 +404,28 @@ class Worker():
             'flags': 0,
         }
 
-        async with AsyncSession() as session:
-            try:
-                response = await session.post(
-                    url='https://discord.com/api/v9/channels/1295483942803210260/messages',
-                    headers=self.ds_headers, json=json, proxy=self.client.proxy_init
-                )
+        try:
+            response = await http_sessions.post(
+                url='https://discord.com/api/v9/channels/1295483942803210260/messages',
+                headers=self.ds_headers, json=json, proxy=self.client.proxy_init
+            )
 
-                if response.status_code != 200:
-                    logger.error(
-                        f'{self.client.name} |Request error: {response.status_code} '
-                        f'Check Discrod authorization token !'
-                    )
-                    progress[self.client.address] = False
-                    self.save_progress(progress, file=self.feedback)
-                    return False
-                
-                logger.success(f'{self.client.name} | Successfully sent feedback. Contract Address: {contract_address}')
-
-                progress[self.client.address] = True
-                self.save_progress(progress, file=self.feedback)
-
-            except Exception as e:
-                logger.error(f'{self.client.name} | Error when sending feedback: {e}')
+            if response.status_code != 200:
+                logger.error(
+                    f'{self.client.name} |Request error: {response.status_code} '
+                    f'Check Discrod authorization token !'
+                )
+                progress_store.set(self.feedback, self.client.address, False)
                 return False
             
+            logger.success(f'{self.client.name} | Successfully sent feedback. Contract Address: {contract_address}')
+
+            progress_store.set(self.feedback, self.client.address, True)
+
+        except Exception as e:
+            logger.error(f'{self.client.name} | Error when sending feedback: {e}')
+            return False
+        
     async def gm_gn_message(self):
         if self.client.ds_auth_token in [None, '']:
             logger.warning(f'Skip {self.client.name}: missing DS-token')
@@ -442,31 +444,26 @@ class Worker():
             'flags': 0,
         }
 
-        progress = self.load_progress(self.gm_check_time)
+        try:
+            response = await http_sessions.post(
+                url='https://discord.com/api/v9/channels/1298244488640335883/messages',
+                headers=self.ds_headers, json=json, proxy=self.client.proxy_init
+            )
 
-        async with AsyncSession() as session:
-            try:
-                response = await session.post(
-                    url='https://discord.com/api/v9/channels/1298244488640335883/messages',
-                    headers=self.ds_headers, json=json, proxy=self.client.proxy_init
+            if response.status_code != 200:
+                logger.error(
+                    f'{self.client.name} |Request error: {response.status_code}'
+                    f'Check Discrod authorization token !'
                 )
+                progress_store.set(self.gm_check_time, self.client.address, {})
+                return False
+            
+            logger.success(f'{self.client.name} | Successfully sent a message')
 
-                if response.status_code != 200:
-                    logger.error(
-                        f'{self.client.name} |Request error: {response.status_code}'
-                        f'Check Discrod authorization token !'
-                    )
-                    progress[self.client.address] = {}
-                    self.save_progress(progress, file=self.gm_check_time)
-                    return False
-                
-                logger.success(f'{self.client.name} | Successfully sent a message')
-
-                progress[self.client.address] = {
-                    'timestamp': datetime.now().isoformat()
-                }
-                self.save_progress(progress, file=self.gm_check_time)
+            progress_store.set(self.gm_check_time, self.client.address, {
+                'timestamp': datetime.now().isoformat()
+            })
 
-            except Exception as e:
-                logger.error(f'{self.client.name} | Error when sending a message: {e}')
-                return False
+        except Exception as e:
+            logger.error(f'{self.client.name} | Error when sending a message: {e}')
+            return False